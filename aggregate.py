@@ -0,0 +1,80 @@
+"""Summary statistics of close approach distance and velocity, optionally grouped.
+
+A `Summary` accumulates the count and the minimum, maximum and mean of the
+distance and velocity of the approaches added to it, in constant space.
+`NEODatabase.aggregate` feeds it the values of matching rows directly, so no
+`CloseApproach` objects or output rows are built.
+"""
+
+import datetime
+
+# Ways in which matches can be grouped, besides not at all.
+GROUP_BY = ('year', 'month', 'designation')
+
+
+class Summary:
+    """Count, min, max and mean of the distance and velocity of some approaches."""
+
+    __slots__ = ('count', 'distance_min', 'distance_max', 'distance_sum',
+                 'velocity_min', 'velocity_max', 'velocity_sum')
+
+    def __init__(self):
+        self.count = 0
+        self.distance_min = self.velocity_min = float('inf')
+        self.distance_max = self.velocity_max = float('-inf')
+        self.distance_sum = self.velocity_sum = 0.0
+
+    def add(self, distance, velocity):
+        """Include one approach with the given distance and velocity."""
+        self.count += 1
+        self.distance_sum += distance
+        self.velocity_sum += velocity
+        if distance < self.distance_min:
+            self.distance_min = distance
+        if distance > self.distance_max:
+            self.distance_max = distance
+        if velocity < self.velocity_min:
+            self.velocity_min = velocity
+        if velocity > self.velocity_max:
+            self.velocity_max = velocity
+
+    @property
+    def distance_mean(self):
+        """Return the mean distance, in au, or NaN if empty."""
+        return self.distance_sum / self.count if self.count else float('nan')
+
+    @property
+    def velocity_mean(self):
+        """Return the mean velocity, in km/s, or NaN if empty."""
+        return self.velocity_sum / self.count if self.count else float('nan')
+
+    def as_dict(self):
+        """Return the statistics as a plain dictionary."""
+        return {
+            'count': self.count,
+            'distance_au': {'min': self.distance_min, 'max': self.distance_max,
+                            'mean': self.distance_mean},
+            'velocity_km_s': {'min': self.velocity_min, 'max': self.velocity_max,
+                              'mean': self.velocity_mean},
+        }
+
+    def __repr__(self):
+        return (f"Summary(count={self.count}, distance={self.distance_min:.4f}.."
+                f"{self.distance_max:.4f} (mean {self.distance_mean:.4f}), "
+                f"velocity={self.velocity_min:.2f}..{self.velocity_max:.2f} "
+                f"(mean {self.velocity_mean:.2f}))")
+
+
+def group_key(store, group_by):
+    """Return a function from a row position of `store` to its group.
+
+    Years are ints, months are 'YYYY-MM' strings and designations are strings.
+    """
+    if group_by in ('year', 'month'):
+        get_date = store.getter('date')
+        if group_by == 'year':
+            return lambda row: datetime.date.fromordinal(get_date(row)).year
+        return lambda row: datetime.date.fromordinal(get_date(row)).strftime('%Y-%m')
+    if group_by == 'designation':
+        return store.getter('designation')
+    raise ValueError(f"Cannot group by {group_by!r}; choose one of {GROUP_BY}.")
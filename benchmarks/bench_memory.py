@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Report the memory cost per model object, with and without `__slots__`.
+
+The "before" figures use twins of `NearEarthObject` and `CloseApproach` that
+share their methods but keep a per-instance `__dict__`, as the models did
+before they were slotted. Each variant loads the same rows and the traced
+allocation is divided by the number of objects built.
+
+Run from the project root:
+
+    $ python3 benchmarks/bench_memory.py
+    $ python3 benchmarks/bench_memory.py --neofile data/neos.csv --cadfile data/cad.json
+"""
+import argparse
+import csv
+import gc
+import json
+import pathlib
+import sys
+import tracemalloc
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from models import NearEarthObject, CloseApproach  # noqa: E402
+
+TESTS_ROOT = PROJECT_ROOT / 'tests'
+
+
+def unslotted(cls):
+    """Return a copy of a slotted class whose instances keep a `__dict__`."""
+    namespace = {key: value for key, value in vars(cls).items()
+                 if key != '__slots__' and key not in cls.__slots__}
+    return type(cls.__name__, (), namespace)
+
+
+def measure(build, rows):
+    """Return the traced bytes per object of building one object per row."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(row) for row in rows]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / max(len(objects), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--neofile', type=pathlib.Path, default=TESTS_ROOT / 'test-neos-2020.csv')
+    parser.add_argument('--cadfile', type=pathlib.Path, default=TESTS_ROOT / 'test-cad-2020.json')
+    args = parser.parse_args()
+
+    with open(args.neofile, newline='') as f:
+        neo_rows = list(csv.DictReader(f))
+    with open(args.cadfile) as f:
+        cad_rows = json.load(f)['data']
+
+    def neo_builder(cls):
+        return lambda row: cls(designation=row['pdes'], name=row['name'],
+                               diameter=row['diameter'], hazardous=row['pha'])
+
+    def approach_builder(cls):
+        return lambda row: cls(designation=row[0], time=row[3],
+                               distance=float(row[4]), velocity=float(row[7]))
+
+    print(f"{'model':<16} {'rows':>8} {'dict B/obj':>11} {'slots B/obj':>12} {'saved':>7}")
+    for cls, builder, rows in ((NearEarthObject, neo_builder, neo_rows),
+                               (CloseApproach, approach_builder, cad_rows)):
+        before = measure(builder(unslotted(cls)), rows)
+        after = measure(builder(cls), rows)
+        print(f"{cls.__name__:<16} {len(rows):>8} {before:>11.1f} {after:>12.1f} "
+              f"{1 - after / before:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
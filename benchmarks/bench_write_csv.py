@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Compare the rows per second of the batched CSV writer and a row-by-row one.
+
+The "before" writer is a twin of `write_to_csv` as it was before batching: one
+`writerow` call per approach, reading the NEO's attributes afresh each time,
+through the default file buffer. Both write the same approaches, repeated to
+the requested number of rows, to a temporary file; the best of a few runs is
+reported.
+
+Run from the project root:
+
+    $ python3 benchmarks/bench_write_csv.py
+    $ python3 benchmarks/bench_write_csv.py --rows 2000000 --neofile data/neos.csv --cadfile data/cad.json
+"""
+import argparse
+import csv
+import itertools
+import pathlib
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from database import NEODatabase  # noqa: E402
+from extract import load_neos, load_approaches  # noqa: E402
+from write import write_to_csv  # noqa: E402
+
+TESTS_ROOT = PROJECT_ROOT / 'tests'
+
+
+def write_to_csv_by_row(results, filename):
+    """Write approaches to CSV one `writerow` call at a time, as before batching."""
+    fieldnames = (
+        'datetime_utc', 'distance_au', 'velocity_km_s',
+        'designation', 'name', 'diameter_km', 'potentially_hazardous')
+    with open(filename, 'w') as csv_outfile:
+        writer_csv = csv.writer(csv_outfile)
+        writer_csv.writerow(fieldnames)
+        for approach in results:
+            writer_csv.writerow([
+                approach.time,
+                approach.distance,
+                approach.velocity,
+                approach.neo.designation,
+                approach.neo.name,
+                approach.neo.diameter,
+                approach.neo.hazardous,
+            ])
+
+
+def measure(writer, approaches, rows, path, repeat):
+    """Return the best rows per second of `writer` over `repeat` runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        results = itertools.islice(itertools.cycle(approaches), rows)
+        start = time.perf_counter()
+        writer(results, path)
+        best = min(best, time.perf_counter() - start)
+    return rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--neofile', type=pathlib.Path, default=TESTS_ROOT / 'test-neos-2020.csv')
+    parser.add_argument('--cadfile', type=pathlib.Path, default=TESTS_ROOT / 'test-cad-2020.json')
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    approaches = load_approaches(args.cadfile)
+    NEODatabase(load_neos(args.neofile), approaches)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'results.csv'
+        before = measure(write_to_csv_by_row, approaches, args.rows, path, args.repeat)
+        after = measure(write_to_csv, approaches, args.rows, path, args.repeat)
+
+    print(f"{'writer':<12} {'rows':>9} {'rows/s':>11}")
+    print(f"{'by row':<12} {args.rows:>9} {before:>11,.0f}")
+    print(f"{'batched':<12} {args.rows:>9} {after:>11,.0f}")
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""A bounded LRU cache of query results, for repeated combinations of filters.
+
+`QueryCache` maps a normalized form of a filter collection to the row positions
+that matched it, stored compactly in an `array`. The key does not depend on
+the order of the filters, so `--max-distance 0.1 --hazardous` and
+`--hazardous --max-distance 0.1` share an entry. The least recently used
+entries are evicted once either the number of entries or their total size in
+bytes exceeds its limit.
+
+Like `functools.lru_cache`, the cache counts hits and misses, reported by
+`info()`, and is safe to share between threads. A pickled cache keeps its
+limits but not its entries.
+"""
+
+import collections
+import sys
+import threading
+from array import array
+
+CacheInfo = collections.namedtuple('CacheInfo', 'hits misses maxsize currsize nbytes maxbytes')
+
+
+class QueryCache:
+    """Row positions matched by recent queries, evicted least recently used first."""
+
+    def __init__(self, maxsize=128, maxbytes=64 << 20):
+        """Create an empty `QueryCache`.
+
+        :param maxsize: Maximum number of cached queries; 0 disables the cache.
+        :param maxbytes: Maximum total size in bytes of the cached row positions.
+        """
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        return (self.__class__, (self.maxsize, self.maxbytes))
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(filters):
+        """Return an order-independent key for a collection of filters.
+
+        Returns None if a filter has no hashable description, in which case the
+        query is not cached.
+        """
+        try:
+            key = frozenset((type(f), f.op, f.value) for f in filters)
+            hash(key)
+        except (AttributeError, TypeError):
+            return None
+        return key
+
+    def get(self, key):
+        """Return the row positions cached under `key`, or None, counting a hit or miss."""
+        with self._lock:
+            rows = self._entries.get(key) if key is not None else None
+            if rows is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def put(self, key, rows):
+        """Cache the row positions matched under `key`, evicting old entries to make room."""
+        if key is None or not self.maxsize:
+            return
+        rows = rows if isinstance(rows, array) else array('i', rows)
+        size = sys.getsizeof(rows)
+        if size > self.maxbytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= sys.getsizeof(self._entries.pop(key))
+            self._entries[key] = rows
+            self.nbytes += size
+            while len(self._entries) > self.maxsize or self.nbytes > self.maxbytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= sys.getsizeof(evicted)
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.nbytes = 0
+
+    def info(self):
+        """Return a `CacheInfo` of the counters and current usage."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries),
+                         self.nbytes, self.maxbytes)
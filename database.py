@@ -1,11 +1,105 @@
-"""database encapsulating collections of near-Earth objects and their close approaches."""
+"""database encapsulating collections of near-Earth objects and their close approaches.
+
+Close approaches are kept in one of the backends from `storage`: by default an
+`ApproachList` of linked `CloseApproach` objects, or, with `columnar=True`, an
+`ApproachTable` that stores their values in typed columns and only builds
+`CloseApproach` objects for rows that are returned.
+
+Sorted indexes on the approach date, distance and velocity are built with the
+database. A query estimates how many rows each indexed criterion lets through,
+drives its scan from the index slice of the most selective one, and checks the
+other filters as residual predicates on just those rows.
+
+Criteria on NEO attributes (diameter, hazardous) are pushed down: they are
+checked once per NEO, and when few NEOs qualify only the approaches of those
+NEOs are scanned.
+
+NEOs can be looked up by exact name or designation, or through sorted
+case-folded indexes of them by `find_neos`, which also handles prefixes and
+near misses.
+
+Each NEO's approaches are kept in time order, so its next or previous approach
+relative to a moment, or its approaches within a window, are found by binary
+search.
+
+Besides yielding matching approaches, the database can `aggregate` them into
+summary statistics, optionally grouped, without building any objects.
+
+The row positions matched by recent queries are kept in a bounded LRU
+`QueryCache`, so repeating a combination of filters skips the scan entirely.
+"""
+
+import bisect
+import functools
+import gc
+import heapq
+import itertools
+from array import array
+
+import metrics
+import parallel
+import vectorized
+from aggregate import Summary, group_key
+from cache import QueryCache
+from filters import compile_predicate
+from index import NameIndex, SortedIndex, indexable
+from storage import ApproachList, ApproachTable, NEO_FIELDS, datetime_to_minutes
+
+# Fields that get a sorted index when the database is built.
+INDEXED_FIELDS = ('date', 'distance', 'velocity')
+
+# Fields that query results can be sorted by.
+SORT_FIELDS = ('time', 'distance', 'velocity', 'diameter')
+
+# Above this fraction of all rows, walking an index slice costs more than a full scan.
+INDEX_SCAN_THRESHOLD = 0.5
+
+# The per-approach columns of an `ApproachTable`, as returned by `to_columns`.
+_TABLE_COLUMNS = ('time', 'distance', 'velocity', 'neo')
 
 
 class NEODatabase:
     """A database of near-Earth objects and their close approaches."""
-    def __init__(self, neos, approaches):
+    def __init__(self, neos, approaches, columnar=False, cache_size=128, cache_bytes=64 << 20):
+        """Create a new `NEODatabase`, linking each approach to its NEO.
+
+        `approaches` may be any iterable - including the generator returned by
+        `extract.iter_approaches` - and is consumed once, linking as it goes.
+
+        :param neos: A collection of `NearEarthObject`s.
+        :param approaches: An iterable of `CloseApproach`es.
+        :param columnar: Whether to store approaches in an `ApproachTable`. The
+            `approaches` of each NEO are then left empty; use `approaches_of`.
+        :param cache_size: Maximum number of query results to cache; 0 disables caching.
+        :param cache_bytes: Maximum total size in bytes of the cached results.
+        """
+        self._add_neos(neos, columnar, cache_size, cache_bytes)
+
+        # Row positions of each NEO's approaches, by designation.
+        self._neo_rows = {}
+        for approach in approaches:
+            neo = self.designation_map[approach.designation]
+            self._neo_rows.setdefault(neo.designation, array('i')).append(len(self._approaches))
+            self._approaches.add(approach, neo)
+
+        # Put each NEO's approaches in time order, keeping their times in
+        # minutes alongside, so lookups by time are binary searches.
+        time = self._approaches.getter('time')
+        minutes = time if columnar else lambda row: datetime_to_minutes(time(row))
+        self._neo_times = {}
+        for designation, rows in self._neo_rows.items():
+            rows[:] = array('i', sorted(rows, key=minutes))
+            self._neo_times[designation] = array('q', map(minutes, rows))
+            if not columnar:
+                self.designation_map[designation].approaches[:] = map(self._approaches.approach, rows)
+
+        self._indexes = {field: SortedIndex(self._approaches, field) for field in INDEXED_FIELDS}
+
+    def _add_neos(self, neos, columnar, cache_size, cache_bytes):
+        """Set up the NEOs and their lookups, an empty approach store and the cache."""
         self._neos = neos
-        self._approaches = approaches
+        self._approaches = ApproachTable(neos) if columnar else ApproachList()
+        self._cache = QueryCache(cache_size, cache_bytes)
 
         self.designation_map = {}
         self.name_map = {}
@@ -16,10 +110,89 @@ class NEODatabase:
             if neo.name:
                 #get_neo_by_name
                 self.name_map[neo.name] = neo
-        for approach in self._approaches:
-            neo = self.designation_map[approach.designation]
-            approach.neo = neo
-            neo.approaches.append(approach)
+        # Case-insensitive, prefix and fuzzy lookups by name and designation.
+        self._name_index = NameIndex(self.name_map)
+        self._designation_index = NameIndex(self.designation_map)
+
+    def to_columns(self):
+        """Return the NEOs and the rest of the database as typed arrays.
+
+        The arrays are the approach columns of an `ApproachTable` (`time`,
+        `distance`, `velocity` and `neo`, an index into the returned NEOs),
+        each NEO's approach rows and times in time order (`neo_rows` and
+        `neo_times`, `neo_counts` of them per NEO), and the `rows` and `keys`
+        of each sorted index. `from_columns` rebuilds the database from them.
+
+        :return: A tuple of a list of `NearEarthObject`s and a dict of `array`s.
+        """
+        table = self._approaches
+        if not table.columnar:
+            table = ApproachTable(self._neos)
+            for approach in self._approaches:
+                table.add(approach, approach.neo)
+        columns = {field: getattr(table, field) for field in _TABLE_COLUMNS}
+        counts, rows, times = array('i'), array('i'), array('q')
+        for position, neo in enumerate(table.neos):
+            # Only the NEO that a designation resolves to owns its approaches.
+            owner = table.neo_index.get(neo.designation) == position
+            counts.append(len(self._neo_rows.get(neo.designation, ())) if owner else 0)
+            if owner and counts[-1]:
+                rows.extend(self._neo_rows[neo.designation])
+                times.extend(self._neo_times[neo.designation])
+        columns.update(neo_counts=counts, neo_rows=rows, neo_times=times)
+        for field, index in self._indexes.items():
+            columns[f'{field}_index_rows'] = index.rows
+            columns[f'{field}_index_keys'] = index.keys
+        return table.neos, columns
+
+    @classmethod
+    def from_columns(cls, neos, columns, columnar=False, cache_size=128, cache_bytes=64 << 20):
+        """Rebuild a database from the NEOs and arrays returned by `to_columns`.
+
+        Nothing is sorted or searched: the arrays are used as they are. With
+        `columnar=False` a `CloseApproach` is built and linked for every row,
+        which takes far longer than adopting the columns.
+
+        :param neos: A list of `NearEarthObject`s, with no approaches yet.
+        :param columns: A dict of `array`s, as returned by `to_columns`.
+        :param columnar: Whether to store approaches in an `ApproachTable`.
+        :param cache_size: Maximum number of query results to cache; 0 disables caching.
+        :param cache_bytes: Maximum total size in bytes of the cached results.
+        """
+        database = cls.__new__(cls)
+        database._add_neos(neos, columnar, cache_size, cache_bytes)
+        table = database._approaches if columnar else ApproachTable(neos)
+        for field in _TABLE_COLUMNS:
+            setattr(table, field, columns[field])
+
+        database._neo_rows, database._neo_times = {}, {}
+        start = 0
+        for neo, count in zip(table.neos, columns['neo_counts']):
+            if count:
+                database._neo_rows[neo.designation] = columns['neo_rows'][start:start + count]
+                database._neo_times[neo.designation] = columns['neo_times'][start:start + count]
+                start += count
+
+        if not columnar:
+            # Every object built here stays alive, so collecting cycles meanwhile is wasted work.
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                store = database._approaches
+                store.extend(table)
+                for designation, rows in database._neo_rows.items():
+                    database.designation_map[designation].approaches[:] = map(store.approach, rows)
+            finally:
+                if enabled:
+                    gc.enable()
+
+        database._indexes = {
+            field: SortedIndex.from_arrays(database._approaches, field,
+                                           columns[f'{field}_index_rows'],
+                                           columns[f'{field}_index_keys'])
+            for field in INDEXED_FIELDS
+        }
+        return database
 
     def get_neo_by_designation(self, designation):
         """Find & return an NEO by its primary designation.Not found 'None'."""
@@ -29,9 +202,302 @@ class NEODatabase:
         """Find and return an NEO by its name. Return `None` if not found."""
         return self.name_map.get(name) if name else None
 
-    def query(self, filters=()):
-        """ Filters capturing user-specified criteria. Returns stream of matching objects."""
-        for approach in self._approaches:
-            flag = False in map(lambda f: f(approach), filters)
-            if not flag:
-                yield approach
+    def find_neos(self, text, by='name', prefix=False, max_edits=0):
+        """Find NEOs by name or designation, ignoring case.
+
+        :param text: The name or designation (or the start of one) to look for.
+        :param by: Either 'name' or 'designation'.
+        :param prefix: Whether to match every NEO whose key starts with `text`.
+        :param max_edits: If positive, also match keys within this many
+            single-character edits of `text`, closest first.
+        :return: A list of matching `NearEarthObject`s.
+        """
+        if by not in ('name', 'designation'):
+            raise ValueError(f"Cannot search NEOs by {by!r}; use 'name' or 'designation'.")
+        index = self._name_index if by == 'name' else self._designation_index
+        if not text:
+            return []
+        if prefix:
+            return index.prefix(text)
+        if max_edits > 0:
+            return index.similar(text, max_edits)
+        return index.exact(text)
+
+    def approaches_of(self, neo):
+        """Return the close approaches of an NEO, whichever backend holds them.
+
+        Approaches are in time order. The columnar backend builds them afresh
+        on each call.
+        """
+        if not self._approaches.columnar:
+            return neo.approaches
+        return [self._approaches.approach(row) for row in self._neo_rows.get(neo.designation, ())]
+
+    def next_approach(self, neo, after):
+        """Return the first close approach of an NEO strictly after a datetime, or None."""
+        rows, times = self._timeline(neo)
+        i = bisect.bisect_right(times, datetime_to_minutes(after))
+        return self._approaches.approach(rows[i]) if i < len(rows) else None
+
+    def previous_approach(self, neo, before):
+        """Return the last close approach of an NEO strictly before a datetime, or None."""
+        rows, times = self._timeline(neo)
+        i = bisect.bisect_left(times, _ceil_minutes(before))
+        return self._approaches.approach(rows[i - 1]) if i else None
+
+    def approaches_between(self, neo, start=None, end=None):
+        """Return the close approaches of an NEO from `start` up to, not including, `end`.
+
+        :param neo: A `NearEarthObject` in this database.
+        :param start: The earliest datetime to include, or None for no lower bound.
+        :param end: The datetime to stop before, or None for no upper bound.
+        :return: A list of `CloseApproach`es, in time order.
+        """
+        rows, times = self._timeline(neo)
+        lo = bisect.bisect_left(times, _ceil_minutes(start)) if start is not None else 0
+        hi = bisect.bisect_left(times, _ceil_minutes(end), lo) if end is not None else len(rows)
+        return [self._approaches.approach(row) for row in rows[lo:hi]]
+
+    def _timeline(self, neo):
+        """Return the row positions of an NEO's approaches and their times, in time order."""
+        return self._neo_rows.get(neo.designation, ()), self._neo_times.get(neo.designation, ())
+
+    def _plan(self, filters):
+        """Choose how to evaluate `filters`.
+
+        Each indexed field with criteria on it is narrowed to one index slice,
+        whose length is exactly the number of rows those criteria pass.
+        Criteria on NEO attributes are evaluated once per NEO, and pass exactly
+        the approaches of the NEOs that qualify. The narrowest of these
+        candidate row sets drives the scan, if it is selective enough to beat
+        a full scan.
+
+        :return: A tuple of the row positions to consider (None for every row)
+            and the filters left to check on them.
+        """
+        candidates = []  # (number of rows, function returning them, filters used)
+        for field, index in self._indexes.items():
+            on_field = [f for f in filters if indexable(f, field)]
+            if on_field:
+                lo, hi = index.intersect(on_field)
+                candidates.append((hi - lo, functools.partial(index.rows_in, lo, hi), on_field))
+        on_neo = [f for f in filters if getattr(f, 'field', None) in NEO_FIELDS]
+        if on_neo:
+            neo_rows = self._neo_rows_matching(on_neo)
+            candidates.append((sum(len(rows) for rows in neo_rows),
+                               lambda: sorted(itertools.chain.from_iterable(neo_rows)), on_neo))
+
+        if not candidates:
+            return None, list(filters)
+        count, rows, used = min(candidates, key=lambda candidate: candidate[0])
+        if count > INDEX_SCAN_THRESHOLD * len(self._approaches):
+            return None, list(filters)
+        return rows(), [f for f in filters if f not in used]
+
+    def _neo_rows_matching(self, filters):
+        """Return the approach row positions of each NEO passing the NEO-level `filters`."""
+        predicate = compile_predicate([(f'neo.{f.field}', f.op, f.value) for f in filters], 'neo')
+        return [rows for designation, rows in self._neo_rows.items()
+                if predicate(self.designation_map[designation])]
+
+    def _selectivity(self, f):
+        """Return the fraction of all rows that filter `f` passes, if an index knows it."""
+        index = self._indexes.get(getattr(f, 'field', None))
+        if index is None or not len(index) or not indexable(f, index.field):
+            return None
+        lo, hi = index.span(f.op, f.value)
+        return (hi - lo) / len(index)
+
+    def query(self, filters=(), vectorized_scan=False, workers=None,
+              sort_by=None, descending=False, limit=None):
+        """ Filters capturing user-specified criteria. Returns stream of matching objects.
+
+        The query planner (`_plan`) picks the most selective indexed criterion
+        to narrow the rows scanned; results are still yielded in load order.
+        The residual filters are fused into one compiled predicate, ordered by
+        the selectivities the indexes measure. Results of a completed query are
+        cached, so repeating it only rebuilds the matching approaches.
+
+        With `vectorized_scan=True` and the columnar store, the residual filters
+        are instead evaluated as NumPy masks over whole columns (see
+        `vectorized`), which needs NumPy; the default store ignores it.
+        With `workers` greater than one, the scan is instead partitioned across
+        that many processes (see `parallel`); results keep the same order.
+
+        With `sort_by`, results are ordered by that field (one of `SORT_FIELDS`),
+        with unknown diameters last. Given a `limit` too, only the top `limit`
+        are kept, by a bounded heap over the matches or, when no criterion is
+        selective and the field is indexed, by walking its index in order.
+        """
+        store = self._approaches
+        if sort_by:
+            rows = self._top(filters, sort_by, descending, limit, vectorized_scan, workers)
+        else:
+            rows = itertools.islice(self._matches(filters, vectorized_scan, workers), limit or None)
+        for row in rows:
+            yield store.approach(row)
+
+    def count(self, filters=()):
+        """Return the number of close approaches matching `filters`, without building any.
+
+        Criteria that all fall on a single indexed field are counted as the
+        length of their index slice, and criteria only on NEO attributes as the
+        total approaches of the qualifying NEOs. Anything else is counted by
+        scanning matching row positions, as for `query` (sharing its cache).
+        """
+        if not filters:
+            return len(self._approaches)
+        fields = {getattr(f, 'field', None) for f in filters}
+        if len(fields) == 1:
+            index = self._indexes.get(next(iter(fields)))
+            if index is not None and all(indexable(f, index.field) for f in filters):
+                lo, hi = index.intersect(filters)
+                return hi - lo
+        if fields <= set(NEO_FIELDS):
+            return sum(len(rows) for rows in self._neo_rows_matching(filters))
+        return sum(1 for _ in self._matches(filters))
+
+    def aggregate(self, filters=(), group_by=None):
+        """Summarize the distance and velocity of the approaches matching `filters`.
+
+        Matching rows are found as for `query` (and share its cache), and their
+        values are folded into `Summary` objects in a single pass, without
+        building any `CloseApproach`.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :param group_by: None, or one of `aggregate.GROUP_BY`.
+        :return: A `Summary` if `group_by` is None, else a dict mapping each
+            group to its `Summary`, in sorted order of the groups.
+        """
+        store = self._approaches
+        distance, velocity = store.getter('distance'), store.getter('velocity')
+        if group_by is None:
+            summary = Summary()
+            for row in self._matches(filters):
+                summary.add(distance(row), velocity(row))
+            return summary
+
+        key = group_key(store, group_by)
+        groups = {}
+        for row in self._matches(filters):
+            group = key(row)
+            summary = groups.get(group)
+            if summary is None:
+                summary = groups[group] = Summary()
+            summary.add(distance(row), velocity(row))
+        return dict(sorted(groups.items()))
+
+    def _matches(self, filters, vectorized_scan=False, workers=None):
+        """Return an iterable of the matching row positions, in order, using the cache."""
+        key = self._cache.key(filters)
+        matches = self._cache.get(key) if key is not None else None
+        if matches is None:
+            matches = self._scan(filters, vectorized_scan, workers)
+            if key is not None:
+                matches = self._record(key, matches)
+        return matches
+
+    def _top(self, filters, sort_by, descending, limit, vectorized_scan=False, workers=None):
+        """Return the row positions of the matches, ordered by `sort_by`, up to `limit`."""
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {sort_by!r}; choose one of {SORT_FIELDS}.")
+        index = self._indexes.get(sort_by)
+        if limit and index is not None:
+            rows, residual = self._plan(filters)
+            if rows is None:
+                order = reversed(index.rows) if descending else index.rows
+                matches = self._approaches.scan(residual, order, selectivity=self._selectivity)
+                return itertools.islice(matches, limit)
+
+        get = self._approaches.getter(sort_by)
+
+        def key(row):
+            # Unknown (NaN) values are ranked past every known one, either way round,
+            # and tie with each other so that they stay in load order.
+            value = get(row)
+            if value != value:
+                return (not descending, 0)
+            return (descending, value)
+
+        matches = self._matches(filters, vectorized_scan, workers)
+        if not limit:
+            return sorted(matches, key=key, reverse=descending)
+        select = heapq.nlargest if descending else heapq.nsmallest
+        return select(limit, matches, key=key)
+
+    def _scan(self, filters, vectorized_scan=False, workers=None):
+        """Return an iterable of the row positions, in order, that pass every filter."""
+        store = self._approaches
+        rows, residual = self._plan(filters)
+        vectorized_scan = vectorized_scan and store.columnar
+        recorder = metrics.recorder()
+        if recorder is None:
+            if vectorized_scan:
+                return vectorized.scan(store, residual, rows)
+            if workers and workers > 1:
+                return parallel.scan(store, residual, rows, workers, selectivity=self._selectivity)
+            return store.scan(residual, rows, selectivity=self._selectivity)
+
+        counters = recorder.counters
+        for f in filters:
+            if f not in residual:
+                metrics.count(f'answered by the planner: {f!r}')
+        if vectorized_scan or (workers and workers > 1):
+            # These scans consider every candidate row, however many are consumed.
+            metrics.count('rows scanned', len(store) if rows is None else len(rows))
+            if vectorized_scan:
+                matches = vectorized.scan(store, residual, rows)
+            else:
+                matches = parallel.scan(store, residual, rows, workers,
+                                        selectivity=self._selectivity)
+            return self._counted(matches, 'rows matched', counters)
+
+        # The usual fused scan, counting in C the rows each filter is first to reject.
+        rejections = {f: itertools.count(1) for f in residual}
+        on_reject = {f: counter.__next__ for f, counter in rejections.items()}
+        matches = store.scan(residual, rows, selectivity=self._selectivity, on_reject=on_reject)
+        return self._counted_scan(matches, rejections, counters)
+
+    @staticmethod
+    def _counted_scan(matches, rejections, counters):
+        """Pass row positions through, then add up the rows scanned, matched and rejected.
+
+        The counts are added once the scan is exhausted or abandoned.
+        """
+        matched = 0
+        try:
+            for row in matches:
+                matched += 1
+                yield row
+        finally:
+            scanned = matched
+            for f, counter in rejections.items():
+                rejected = next(counter) - 1
+                counters[f'rejected by {f!r}'] += rejected
+                scanned += rejected
+            counters['rows matched'] += matched
+            counters['rows scanned'] += scanned
+
+    @staticmethod
+    def _counted(rows, name, counters):
+        """Pass row positions through, counting them under `name`."""
+        for row in rows:
+            counters[name] += 1
+            yield row
+
+    def _record(self, key, matches):
+        """Pass row positions through, caching them under `key` once they are exhausted."""
+        rows = array('i')
+        for row in matches:
+            rows.append(row)
+            yield row
+        self._cache.put(key, rows)
+
+    def cache_info(self):
+        """Return the hit and miss counters and usage of the query result cache."""
+        return self._cache.info()
+
+
+def _ceil_minutes(dt):
+    """Convert a datetime into minutes since 0001-01-01, rounding any seconds up."""
+    return datetime_to_minutes(dt) + bool(dt.second or dt.microsecond)
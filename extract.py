@@ -5,37 +5,176 @@ import json
 
 from models import NearEarthObject, CloseApproach
 
+# Columns of the NEO file used to build every `NearEarthObject`.
+NEO_FIELDS = ('pdes', 'name', 'diameter', 'pha')
 
-def load_neos(neo_csv_path):
+# Number of characters read from the close approach file at a time when streaming.
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = ' \t\n\r'
+# Characters that can follow a complete JSON value.
+_VALUE_ENDS = _WHITESPACE + ',]}:'
+
+
+def load_neos(neo_csv_path, extra_fields=()):
     """NEO information from a CSV file. Path to CSV file NEOS.
+
+    Only the columns that are used are pulled out of each row: their positions
+    are resolved once from the header, and rows are read with a plain
+    `csv.reader`. Additional columns (e.g. `H`, `albedo`, `moid`) can be asked
+    for with `extra_fields`; their values are stored, as floats where they
+    parse as numbers, in the `extra` mapping of each `NearEarthObject`.
+
+    :param neo_csv_path: Path to the CSV file of near-Earth objects.
+    :param extra_fields: Names of additional columns to keep for each NEO.
     Return:list NEOS'with' keyword used with open does err handling and closes"""
 
     neo_list = []  # Create an empty list to store NEOs
-    with open(neo_csv_path, 'r') as f:
-        csv_reader = csv.DictReader(f)
-        #file open() method then read using the DictReader for csv_file.
+    with open(neo_csv_path, 'r', newline='') as f:
+        csv_reader = csv.reader(f)
+        header = next(csv_reader, None)
+        if header is None:
+            return neo_list
+        try:
+            pdes, name, diameter, pha = (header.index(field) for field in NEO_FIELDS)
+            extras = [(field, header.index(field)) for field in extra_fields]
+        except ValueError as err:
+            raise ValueError(f"{neo_csv_path} is missing a required column: {err}") from err
+
         for row in csv_reader:
+            if not row:
+                continue  # DictReader used to skip blank lines, too.
+            info = {field: _coerce(row[index]) for field, index in extras}
             neo_list.append(NearEarthObject(
-                designation=row['pdes'],
-                name=row['name'],
-                diameter=float(row['diameter']) if row['diameter'] else float('nan'),
-                hazardous=row['pha']  # convert to boolean
+                designation=row[pdes],
+                name=row[name],
+                diameter=float(row[diameter]) if row[diameter] else float('nan'),
+                hazardous=row[pha],  # convert to boolean
+                extra=info,
                 ))
     return neo_list
 
 
+def _coerce(value):
+    """Convert a raw CSV cell into a float if possible, or None if it is empty."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
 def load_approaches(cad_json_path):
     """Read data JSON file. Cad_json_path: path to datafile."""
+    return list(iter_approaches(cad_json_path))
+
+
+def iter_approaches(cad_json_path, chunk_size=CHUNK_SIZE):
+    """Stream `CloseApproach` objects from a close approach JSON file.
+
+    Rows of the top-level `data` array are decoded one at a time, so only a
+    single row (and one chunk of text) is held in memory at once, and the
+    first approaches are produced before the file has been fully read.
 
-    approaches_list = []
+    :param cad_json_path: Path to the JSON file of close approach data.
+    :param chunk_size: Number of characters to read from the file at a time.
+    :return: A generator of `CloseApproach` objects, in file order.
+    """
     with open(cad_json_path, "r") as infile:
-        json_file = json.load(infile)
-
-        for row in json_file['data']:
-            approaches_list.append(CloseApproach(
-            designation=row[0],  # designation is the first element in the row
-            time=row[3],  # time is the fourth element in the row
-            distance=float(row[4]),  # distance is the fifth element, convert to float
-            velocity=float(row[7]),  # velocity is the eighth element, convert to float
-            ))
-    return approaches_list
+        for row in _iter_json_rows(infile, 'data', chunk_size):
+            yield CloseApproach(
+                designation=row[0],  # designation is the first element in the row
+                time=row[3],  # time is the fourth element in the row
+                distance=float(row[4]),  # distance is the fifth element, convert to float
+                velocity=float(row[7]),  # velocity is the eighth element, convert to float
+            )
+
+
+class _JSONStream:
+    """A forward-only cursor over the text of a JSON document read in chunks."""
+
+    def __init__(self, infile, chunk_size):
+        self.infile = infile
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read another chunk into the buffer. Return False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.infile.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at end of file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        """Consume the next non-whitespace character, which must be `char`."""
+        if self.peek() != char:
+            raise ValueError(f"Malformed JSON: expected {char!r} at offset {self.pos}.")
+        self.pos += 1
+
+    def value(self, decoder=json.JSONDecoder()):
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number may have been cut short by the end of the buffer, e.g. `1.`
+            # decoded as 1: unless it is followed by whatever can end a value,
+            # read more and decode it again.
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and (end == len(self.buffer) or self.buffer[end] not in _VALUE_ENDS)
+                    and self.fill()):
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_json_rows(infile, key, chunk_size=CHUNK_SIZE):
+    """Yield the elements of the array stored under `key` in a top-level JSON object.
+
+    The other members of the object are decoded and discarded as they are met.
+    """
+    stream = _JSONStream(infile, chunk_size)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        member = stream.value()
+        stream.expect(':')
+        if member == key:
+            stream.expect('[')
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() == ']':
+                        stream.pos += 1
+                        break
+                    stream.expect(',')
+        else:
+            stream.value()
+        if stream.peek() == '}':
+            return
+        stream.expect(',')
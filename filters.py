@@ -6,7 +6,12 @@ Function returns a collection of instances of subclasses
 of `AttributeFilter` - a 1-argument callable (on a `CloseApproach`) constructed
 from a comparator (from the `operator` module), a reference value, and a class
 method `get` that subclasses can override to fetch an attribute of interest from
-the supplied `CloseApproach`."""
+the supplied `CloseApproach`. Subclasses also name the `field` they read, so
+that storage backends can evaluate them without building a `CloseApproach`.
+
+`compile_filters` fuses a collection of filters into a single generated
+predicate function that inlines each attribute lookup and comparison, and
+short-circuits with the cheapest, most selective filters first."""
 
 import operator
 from itertools import islice
@@ -17,6 +22,12 @@ class UnsupportedCriterionError(NotImplementedError):
 
 class AttributeFilter:
     """superclass for filters on attributes."""
+    # Name of the approach field read by `get`, as listed in `storage.FIELDS`.
+    field = None
+    # Python source of `get`, in terms of `approach`, inlined by `compile_filters`.
+    expression = None
+    # Relative cost of evaluating the filter once, used to order compiled predicates.
+    cost = 4
 
     def __init__(self, op, value):
         self.op = op
@@ -36,6 +47,10 @@ class AttributeFilter:
 
 class DateFilter(AttributeFilter):
     """A concrete `AttributeFilter` for the `date` attribute."""
+    field = 'date'
+    expression = 'approach.time.date()'
+    cost = 3
+
     @classmethod
     def get(cls, approach):
         """Return approach.time converted to datetime.datetime object for the date filter.
@@ -44,6 +59,10 @@ class DateFilter(AttributeFilter):
 
 class DistanceFilter(AttributeFilter):
     """`AttributeFilter` for the `distance` attribute."""
+    field = 'distance'
+    expression = 'approach.distance'
+    cost = 1
+
     @classmethod
     def get(cls, approach):
         """Return distance of the CloseApproach object for filter.""" 
@@ -51,6 +70,10 @@ class DistanceFilter(AttributeFilter):
 
 class VelocityFilter(AttributeFilter):
     """A concrete `AttributeFilter` for the `velocity` attribute."""
+    field = 'velocity'
+    expression = 'approach.velocity'
+    cost = 1
+
     @classmethod
     def get(cls, approach):
         """A concrete `AttributeFilter` for the `velocity` attribute."""    
@@ -58,12 +81,20 @@ class VelocityFilter(AttributeFilter):
 
 class DiameterFilter(AttributeFilter):
     """A concrete `AttributeFilter` for the `diameter` attribute."""
+    field = 'diameter'
+    expression = 'approach.neo.diameter'
+    cost = 2
+
     @classmethod
     def get(cls, approach):
         return approach.neo.diameter
 
 class HazardousFilter(AttributeFilter):
     """`AttributeFilter` for the `hazardous` attribute."""
+    field = 'hazardous'
+    expression = 'approach.neo.hazardous'
+    cost = 2
+
     @classmethod
     def get(cls, approach):
         """Return whether the NEO is hazardous for filter."""
@@ -116,3 +147,90 @@ def limit(iterator, n=None):
     if n == 0 or n is None:
         return islice(iterator, None)
     return islice(iterator, n)
+
+
+# Python source of the comparators that compiled predicates can inline.
+_OPERATOR_SOURCE = {
+    operator.eq: '==', operator.ne: '!=', operator.lt: '<',
+    operator.le: '<=', operator.gt: '>', operator.ge: '>=',
+}
+
+# Guessed fraction of rows passing a filter, when nothing better is known.
+_EQUALITY_PASS_RATE = 0.1
+_RANGE_PASS_RATE = 0.5
+
+
+def order_filters(filters, selectivity=None):
+    """Order filters so that a short-circuiting `and` rejects rows as cheaply as possible.
+
+    Filters are ranked by cost / (1 - pass rate): cheap filters that reject
+    most rows go first.
+
+    :param filters: A collection of filters.
+    :param selectivity: Optional callable returning the fraction of rows a
+        filter passes, or None if unknown. Otherwise a guess is made from the
+        filter's comparator.
+    :return: A list of the filters in evaluation order.
+    """
+    def rank(f):
+        passes = selectivity(f) if selectivity else None
+        if passes is None:
+            passes = _EQUALITY_PASS_RATE if f.op is operator.eq else _RANGE_PASS_RATE
+        if passes >= 1:
+            return float('inf')
+        return getattr(f, 'cost', AttributeFilter.cost) / (1 - passes)
+    return sorted(filters, key=rank)
+
+
+def compile_predicate(terms, arg='approach', namespace=None, on_reject=None):
+    """Generate a single predicate function that `and`s together some comparisons.
+
+    :param terms: A sequence of `(expression, op, value)` triples. `expression`
+        is Python source in terms of `arg`; `op` is a comparator, or None if
+        `expression` is itself the condition.
+    :param arg: The name of the predicate's only parameter.
+    :param namespace: Names available to the expressions.
+    :param on_reject: An optional sequence of functions of no arguments, one
+        per term, each called when its term is the first to fail; they must
+        return a true value. `itertools.count(1).__next__` counts the rows a
+        term rejects for little more than the cost of the call.
+    :return: A function of one argument returning whether every term holds.
+    """
+    namespace = dict(namespace or {})
+    conditions = []
+    for i, (expression, op, value) in enumerate(terms):
+        if op is None:
+            condition = f"({expression})"
+        elif op in _OPERATOR_SOURCE:
+            namespace[f'_v{i}'] = value
+            condition = f"({expression}) {_OPERATOR_SOURCE[op]} _v{i}"
+        else:
+            namespace[f'_v{i}'], namespace[f'_op{i}'] = value, op
+            condition = f"_op{i}({expression}, _v{i})"
+        if on_reject is not None:
+            namespace[f'_r{i}'] = on_reject[i]
+            condition = f"({condition} or not _r{i}())"
+        conditions.append(condition)
+    source = f"def predicate({arg}):\n    return {' and '.join(conditions) or 'True'}\n"
+    exec(compile(source, '<compiled filters>', 'exec'), namespace)
+    return namespace['predicate']
+
+
+def compile_filters(filters, selectivity=None, on_reject=None):
+    """Fuse a collection of filters into one predicate on a `CloseApproach`.
+
+    Filters with an `expression` have their lookup and comparison inlined;
+    any others are called as they are. See `order_filters` for `selectivity`,
+    and `compile_predicate` for `on_reject`, which here maps each filter to
+    its function.
+    """
+    terms, namespace = [], {}
+    ordered = order_filters(filters, selectivity)
+    for i, f in enumerate(ordered):
+        if getattr(f, 'expression', None):
+            terms.append((f.expression, f.op, f.value))
+        else:
+            namespace[f'_f{i}'] = f
+            terms.append((f'_f{i}(approach)', None, None))
+    on_reject = None if on_reject is None else [on_reject[f] for f in ordered]
+    return compile_predicate(terms, 'approach', namespace, on_reject)
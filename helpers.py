@@ -1,7 +1,8 @@
 """Convert datetimes to and from strings.NASA's dataset provides timestamps (corresponding to UTC).
 
 The `cd_to_datetime` function converts a string, formatted as the `cd` field of
-NASA's close approach data, into a Python `datetime`
+NASA's close approach data, into a Python `datetime`. `fast_cd_to_datetime`
+gives the same result without `strptime`, for use once per row while loading.
 
 The `datetime_to_str` function converts a Python `datetime` into a string.
 `datetime`s string representations,displays seconds, but NASA's data (and our datetimes!) don't
@@ -25,6 +26,35 @@ def cd_to_datetime(calendar_date):
     return datetime.datetime.strptime(calendar_date, "%Y-%b-%d %H:%M")
 
 
+# Month abbreviations used by the `cd` field, as produced by `%b` in the C locale.
+_MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+
+def fast_cd_to_datetime(calendar_date):
+    """Convert a NASA-formatted calendar date/time description into a datetime.
+
+    Equivalent to `cd_to_datetime`, but slices the fixed YYYY-bbb-DD hh:mm
+    layout directly and looks the month up in a table, which is several times
+    faster than `strptime`. Anything not in exactly that layout is handed to
+    `cd_to_datetime`, so odd inputs parse (or fail) just as they did before.
+
+    :param calendar_date: A calendar date in YYYY-bb-DD hh:mm format.
+    :return: `datetime` corresponding to the calendar date and time.
+    """
+    if (len(calendar_date) == 17 and calendar_date[4] == '-' and calendar_date[8] == '-'
+            and calendar_date[11] == ' ' and calendar_date[14] == ':'):
+        month = _MONTHS.get(calendar_date[5:8])
+        digits = calendar_date[:4] + calendar_date[9:11] + calendar_date[12:14] + calendar_date[15:]
+        if month and digits.isdigit():
+            try:
+                return datetime.datetime(int(calendar_date[:4]), month, int(calendar_date[9:11]),
+                                         int(calendar_date[12:14]), int(calendar_date[15:]))
+            except ValueError:
+                pass
+    return cd_to_datetime(calendar_date)
+
+
 def datetime_to_str(dt):
     """Convert a naive Python datetime into a human-readable string.
 
@@ -0,0 +1,166 @@
+"""Sorted secondary indexes over the close approaches in an `NEODatabase`.
+
+A `SortedIndex` orders the row positions of an approach store by the value of
+one field, so that a comparison against that field (`==`, `<`, `<=`, `>`,
+`>=`) selects one contiguous slice of the index, found by binary search with
+the `bisect` module. Only that slice then has to be walked.
+
+A `NameIndex` does the same for the names or designations of NEOs: its keys
+are case-folded and sorted, so case-insensitive exact and prefix lookups are a
+pair of binary searches. Lookups within a bounded edit distance walk the
+sorted keys as if they were a trie: keys that share a prefix share the rows of
+the edit distance table computed for it, and once every cell of a prefix's
+row exceeds the bound, all the keys with that prefix are skipped at once.
+"""
+
+import operator
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Compact typecodes for the keys of the indexable fields.
+_KEY_TYPECODES = {'date': 'q', 'distance': 'd', 'velocity': 'd'}
+
+# Comparators whose matches form a single slice of a sorted index.
+RANGE_OPERATORS = (operator.eq, operator.lt, operator.le, operator.gt, operator.ge)
+
+
+class SortedIndex:
+    """Row positions of an approach store, sorted by the value of one field."""
+
+    def __init__(self, store, field):
+        """Build the index of `store`, a backend from `storage`, on `field`."""
+        self.field = field
+        self.encode = store.encode
+        get = store.getter(field)
+        rows = sorted(range(len(store)), key=get)
+        self.rows = array('i', rows)
+        self.keys = array(_KEY_TYPECODES[field], (get(row) for row in rows))
+
+    @classmethod
+    def from_arrays(cls, store, field, rows, keys):
+        """Adopt the `rows` and `keys` of an index of `store` on `field` built before."""
+        index = cls.__new__(cls)
+        index.field = field
+        index.encode = store.encode
+        index.rows = rows
+        index.keys = keys
+        return index
+
+    def __len__(self):
+        return len(self.rows)
+
+    def span(self, op, value):
+        """Return the `(lo, hi)` slice of the index whose keys satisfy `op(key, value)`.
+
+        :param op: One of `RANGE_OPERATORS`.
+        :param value: A filter's reference value, encoded by the store's rules.
+        """
+        key = self.encode(self.field, value)
+        if op is operator.eq:
+            return bisect_left(self.keys, key), bisect_right(self.keys, key)
+        if op is operator.lt:
+            return 0, bisect_left(self.keys, key)
+        if op is operator.le:
+            return 0, bisect_right(self.keys, key)
+        if op is operator.gt:
+            return bisect_right(self.keys, key), len(self.keys)
+        if op is operator.ge:
+            return bisect_left(self.keys, key), len(self.keys)
+        raise ValueError(f"{op!r} cannot be answered from a sorted index.")
+
+    def intersect(self, filters):
+        """Return the `(lo, hi)` slice satisfying every one of `filters` on this field."""
+        lo, hi = 0, len(self.keys)
+        for f in filters:
+            f_lo, f_hi = self.span(f.op, f.value)
+            lo, hi = max(lo, f_lo), min(hi, f_hi)
+        return lo, max(lo, hi)
+
+    def rows_in(self, lo, hi):
+        """Return the row positions in a slice of the index, in row order."""
+        return sorted(self.rows[lo:hi])
+
+
+def indexable(f, field):
+    """Return whether filter `f` can be answered from an index on `field`."""
+    return getattr(f, 'field', None) == field and f.op in RANGE_OPERATORS
+
+
+class NameIndex:
+    """NEOs sorted by a case-folded name or designation."""
+
+    def __init__(self, mapping):
+        """Build the index from a mapping of names (or designations) to NEOs."""
+        pairs = sorted(((name.casefold(), name) for name in mapping), key=lambda p: p[0])
+        self.keys = [key for key, _ in pairs]
+        self.neos = [mapping[name] for _, name in pairs]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def exact(self, text):
+        """Return the NEOs whose key equals `text`, ignoring case."""
+        key = text.casefold()
+        return self.neos[bisect_left(self.keys, key):bisect_right(self.keys, key)]
+
+    def prefix(self, text):
+        """Return the NEOs whose key starts with `text`, ignoring case, in key order."""
+        key = text.casefold()
+        lo = bisect_left(self.keys, key)
+        return self.neos[lo:bisect_left(self.keys, key + '\U0010ffff', lo)]
+
+    def similar(self, text, max_edits):
+        """Return the NEOs whose key is within `max_edits` edits of `text`, ignoring case.
+
+        An edit inserts, deletes or substitutes one character. Matches are in
+        order of distance, then key.
+        """
+        key = text.casefold()
+        keys = self.keys
+        # rows[depth] is the row of the edit distance table for the first
+        # `depth` characters of the current key, against all prefixes of `key`.
+        rows = [list(range(len(key) + 1))]
+        matches = []
+        previous = ''
+        position = 0
+        while position < len(keys):
+            candidate = keys[position]
+            # Keep the rows of the prefix shared with the previous key.
+            shared = 0
+            limit = min(len(candidate), len(previous), len(rows) - 1)
+            while shared < limit and candidate[shared] == previous[shared]:
+                shared += 1
+            del rows[shared + 1:]
+            previous = candidate
+
+            for depth in range(shared, len(candidate)):
+                char, above = candidate[depth], rows[-1]
+                row = [above[0] + 1]
+                for j, other in enumerate(key, 1):
+                    row.append(min(above[j] + 1, row[j - 1] + 1, above[j - 1] + (char != other)))
+                rows.append(row)
+                if min(row) > max_edits:
+                    # No key starting with this prefix can come within range.
+                    position = bisect_left(keys, candidate[:depth + 1] + '\U0010ffff', position)
+                    break
+            else:
+                if rows[-1][-1] <= max_edits:
+                    matches.append((rows[-1][-1], position))
+                position += 1
+        return [self.neos[position] for _, position in sorted(matches)]
+
+
+def bounded_edit_distance(a, b, limit):
+    """Return the Levenshtein distance between `a` and `b`, or None if it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
@@ -5,7 +5,7 @@
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,stats,serve,interactive} [args]
 
 The `inspect` subcommand looks up an NEO by name or by primary designation, and
 optionally lists all of that NEO's known close approaches:
@@ -13,6 +13,8 @@ optionally lists all of that NEO's known close approaches:
     $ python3 main.py inspect --pdes 1P
     $ python3 main.py inspect --name Halley
     $ python3 main.py inspect --verbose --name Halley
+    $ python3 main.py inspect --name-prefix hal
+    $ python3 main.py inspect --name Apophis --after 2029-01-01 --before 2030-01-01
 
 The `query` subcommand searches for close approaches that match given criteria:
 
@@ -22,39 +24,88 @@ The `query` subcommand searches for close approaches that match given criteria:
     $ python3 main.py query --date 2020-03-14 --max-velocity 25 --min-diameter 0.5 --hazardous
     $ python3 main.py query --start-date 2000-01-01 --max-diameter 0.1 --not-hazardous
     $ python3 main.py query --hazardous --max-distance 0.05 --min-velocity 30
+    $ python3 main.py query --count --start-date 2020-01-01 --end-date 2020-01-31
 
-The set of results can be limited in size and/or saved to an output file in CSV
-or JSON format:
+The set of results can be limited in size and/or saved to an output file in CSV,
+JSON or newline-delimited JSON format, optionally compressed, or in a binary
+columnar format that `write.ColumnReader` maps back into memory:
 
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
+    $ python3 main.py query --start-date 2020-01-01 --outfile results.ndjson.gz
+    $ python3 main.py query --start-date 2020-01-01 --outfile results.neocol
+
+Results can also be ordered, keeping only the top few:
+
+    $ python3 main.py query --sort-by distance --limit 20
+    $ python3 main.py query --hazardous --sort-by velocity --descending --limit 50
+
+The `stats` subcommand summarizes the matching close approaches instead of
+listing them, overall or grouped by year, month or NEO:
+
+    $ python3 main.py stats --hazardous --max-distance 0.05
+    $ python3 main.py stats --start-date 2020-01-01 --group-by month
 
 The `interactive` subcommand loads the NEO database and spawns an interactive
 command shell that can repeatedly execute `inspect` and `query` commands without
 having to wait to reload the database each time. However, it doesn't hot-reload.
 
+The `serve` subcommand loads the NEO database once and answers `inspect`,
+`query` and `stats` commands over a local Unix socket, several at a time,
+streaming their output back as it is produced. While a server is running, those
+commands forward their arguments to it instead of loading the data themselves
+(unless given `--no-server`):
+
+    $ python3 main.py serve &
+    $ python3 main.py query --date 2020-01-01
+
+To see where a run spends its time, `--metrics PATH` records the wall-clock
+and CPU time of each stage (loading, linking, querying, writing) and counts of
+the rows scanned, matched and rejected by each filter (or answered by the query
+planner without a scan), saved as JSON (or, with `--metrics -`, printed to stderr).
+`--profile PATH` saves `cProfile` statistics of the whole run:
+
+    $ python3 main.py --metrics - query --start-date 2020-01-01 --max-distance 0.05
+    $ python3 main.py --profile run.pstats query --outfile results.csv
+
 If needed, the script can load data from data files other than the default with
-`--neofile` or `--cadfile`.
+`--neofile` or `--cadfile`. After the first load, a binary snapshot of the
+linked database is kept next to the close approach file and reused while the
+data files are unchanged; pass `--no-snapshot` to bypass it. With `--columnar`,
+close approaches are held in compact typed columns rather than as objects, and
+are read from the snapshot in milliseconds; without it, every approach object
+has to be rebuilt, which takes seconds for the full data set.
 """
 
 import sys
 import pathlib
 import argparse
+import cProfile
 import cmd
 import datetime
+import functools
 import shlex
+import threading
 import time
 
-from extract import load_neos, load_approaches
-from database import NEODatabase
+import metrics
+import parallel
+import server
+import vectorized
+from aggregate import GROUP_BY
+from database import SORT_FIELDS
+from snapshot import data_fingerprint, load_database
 from filters import create_filters, limit
-from write import write_to_csv, write_to_json
+from write import write_pipelined, writer_for
 
 
 # Paths to the root of the project and the `data` subfolder.
 PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
 DATA_ROOT = PROJECT_ROOT / 'data'
 
+# Subcommands that a running `serve` process can answer.
+SERVED_COMMANDS = ('inspect', 'query', 'stats')
+
 # The current time, for use with the kill-on-change feature of the interactive shell.
 _START = time.time()
 
@@ -74,40 +125,13 @@ def date_fromisoformat(date_string):
         raise argparse.ArgumentTypeError(f"'{date_string}' not valid date. Use YYYY-MM-DD.") from ex
 
 
-def make_parser():
-    """Creates a ArgumentParser for this script.
-    :returning A tuple of the top-level, inspect, and query parsers.
-    """
-    parser = argparse.ArgumentParser(
-        description="Explore past and future close approaches of near-Earth objects."
-    )
-
-    # Add arguments for custom data files.
-    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
-                        type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
-    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
-                        type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
-    subparsers = parser.add_subparsers(dest='cmd')
+def add_filter_arguments(parser):
+    """Add the close approach filter options to a subcommand parser.
 
-    # Add the `inspect` subcommand parser.
-    inspect = subparsers.add_parser('inspect',
-                                  description="Inspect an NEO by primary,"
-                                  " designation or by name.")
-    inspect.add_argument('-v', '--verbose', action='store_true',
-                            help="Additionally, print all known close approaches of this NEO.")
-    inspect_id = inspect.add_mutually_exclusive_group(required=True)
-    inspect_id.add_argument('-p', '--pdes',
-                            help="The primary designation of the NEO to inspect (e.g. '433').")
-    inspect_id.add_argument('-n', '--name',
-                            help="The IAU name of the NEO to inspect (e.g. 'Halley').")
-
-    # Add the `query` subcommand parser.
-    query = subparsers.add_parser('query',
-                                  description="Query for close approaches that "
-                                              "match a collection of filters.")
-    filters = query.add_argument_group('Filters',
+    :param parser: The `argparse.ArgumentParser` of a subcommand.
+    :return: The argument group holding the filter options.
+    """
+    filters = parser.add_argument_group('Filters',
                                        description="Filter close approaches by their attributes "
                                         "or the attributes of their NEOs.") 
     filters.add_argument('-d', '--date', type=date_fromisoformat,
@@ -145,22 +169,130 @@ def make_parser():
     filters.add_argument('--not-hazardous', dest='hazardous', default=None, action='store_false',
                          help="If specified, only return close approaches of NEOs that "
                               "are not potentially hazardous.")
+    return filters
+
+
+def filters_from_args(args):
+    """Construct a collection of filters from the filter options parsed from the command line."""
+    return create_filters(
+        date=args.date, start_date=args.start_date, end_date=args.end_date,
+        distance_min=args.distance_min, distance_max=args.distance_max,
+        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous
+    )
+
+
+def make_parser():
+    """Creates a ArgumentParser for this script.
+    :returning A tuple of the top-level parser, the inspect parser, the query filters
+        group, and the query, interactive and stats parsers.
+    """
+    parser = argparse.ArgumentParser(
+        description="Explore past and future close approaches of near-Earth objects."
+    )
+
+    # Add arguments for custom data files.
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
+                        type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
+                        type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--no-snapshot', dest='snapshot', action='store_false',
+                        help="Always load from the data files, ignoring any cached snapshot.")
+    parser.add_argument('--columnar', action='store_true',
+                        help="Store close approaches in typed columns to save memory and "
+                             "load them from the snapshot in milliseconds.")
+    parser.add_argument('--socket', default=server.default_socket(),
+                        help="Path of the Unix socket of the `serve` subcommand.")
+    parser.add_argument('--no-server', dest='server', action='store_false',
+                        help="Load the data in this process even if a server is running.")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Record the time taken by each stage of the run and counts of the "
+                             "rows scanned, matched and rejected by each filter, and save them "
+                             "as JSON to PATH, or print them to stderr if PATH is '-'.")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="Run under cProfile and save the statistics to PATH, "
+                             "for the `pstats` module.")
+    subparsers = parser.add_subparsers(dest='cmd')
+
+    # Add the `inspect` subcommand parser.
+    inspect = subparsers.add_parser('inspect',
+                                  description="Inspect an NEO by primary,"
+                                  " designation or by name.")
+    inspect.add_argument('-v', '--verbose', action='store_true',
+                            help="Additionally, print all known close approaches of this NEO.")
+    inspect_id = inspect.add_mutually_exclusive_group(required=True)
+    inspect_id.add_argument('-p', '--pdes',
+                            help="The primary designation of the NEO to inspect (e.g. '433').")
+    inspect_id.add_argument('-n', '--name',
+                            help="The IAU name of the NEO to inspect (e.g. 'Halley'), "
+                                 "matched without regard to case.")
+    inspect_id.add_argument('--name-prefix',
+                            help="List every NEO whose name starts with this text, "
+                                 "without regard to case (e.g. 'hal').")
+    inspect.add_argument('--after', type=date_fromisoformat,
+                         help="List the NEO's close approaches on or after this date, in YYYY-MM-DD format.")
+    inspect.add_argument('--before', type=date_fromisoformat,
+                         help="List the NEO's close approaches before this date, in YYYY-MM-DD format.")
+    inspect.add_argument('--max-edits', type=int, default=0,
+                         help="If no NEO has the given name or designation, accept the "
+                              "closest within this many typos.")
+
+    # Add the `query` subcommand parser.
+    query = subparsers.add_parser('query',
+                                  description="Query for close approaches that "
+                                              "match a collection of filters.")
+    filters = add_filter_arguments(query)
     query.add_argument('-l', '--limit', type=int,
                        help="The maximum number of matches to return. "
                             "Defaults to 10 if no --outfile is given.")
     query.add_argument('-o', '--outfile', type=pathlib.Path,
-                       help="File in which to save structured results. "
+                       help="File in which to save structured results: .csv, .json, .ndjson "
+                            "or .jsonl, optionally followed by .gz, .bz2 or .xz, or a binary "
+                            ".neocol file of columns. "
                             "If omitted, results are printed to standard output.")
+    query.add_argument('--pipeline', action='store_true',
+                       help="With --outfile, write the results from a background thread "
+                            "while the query is still producing them. The workers of -j are "
+                            "started before that thread.")
+    query.add_argument('-c', '--count', action='store_true',
+                       help="Only print the number of matching close approaches.")
+    query.add_argument('--sort-by', choices=SORT_FIELDS,
+                       help="Order the matches by this attribute, keeping only the top "
+                            "--limit of them.")
+    query.add_argument('--descending', action='store_true',
+                       help="With --sort-by, order from largest to smallest.")
+    query.add_argument('--vectorized', action='store_true',
+                       help="With --columnar, evaluate the filters as NumPy masks over whole "
+                            "columns; without it, rows are scanned as usual. Requires NumPy.")
+    query.add_argument('-j', '--workers', type=int, default=1,
+                       help="Number of processes to scan with (0 for one per CPU). "
+                            "Defaults to 1.")
+
+    # Add the `stats` subcommand parser.
+    stats = subparsers.add_parser('stats',
+                                  description="Summarize the distance and velocity of the "
+                                              "close approaches that match a collection of filters.")
+    add_filter_arguments(stats)
+    stats.add_argument('-g', '--group-by', choices=GROUP_BY,
+                       help="Summarize each calendar year, month or NEO designation separately.")
 
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command session "
                                              "to repeatedly run `interact` and `query` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
-    return parser, inspect, filters, query, repl
+
+    subparsers.add_parser('serve',
+                          description="Load the data once and answer `inspect`, `query` and "
+                                      "`stats` commands from other invocations of this script.")
+    return parser, inspect, filters, query, repl, stats
 
 
-def inspect(database, pdes=None, name=None, verbose=False):
+def inspect(database, pdes=None, name=None, verbose=False, name_prefix=None, max_edits=0,
+            after=None, before=None, out=None, err=None):
     """Perform the `inspect` subcommand.
 
     This function fetches an NEO by designation or by name. If a matching NEO is
@@ -168,35 +300,60 @@ def inspect(database, pdes=None, name=None, verbose=False):
     all of the NEO's known close approaches is printed if `verbose=True`).
     Otherwise, a message is printed noting that there are no matching NEOs.
 
-    At least one of `pdes` and `name` must be given. If both are given, prefer
-    to look up the NEO by the primary designation.
+    At least one of `pdes`, `name` and `name_prefix` must be given. If several
+    are given, prefer the primary designation, then the name. A designation or
+    name without an exact match is looked up again ignoring case and then, if
+    `max_edits` is positive, allowing that many typos. With `name_prefix`, every
+    NEO whose name starts with it is printed.
+
+    If `after` or `before` is given, only the close approaches from the start
+    of `after` up to the start of `before` are printed, verbose or not.
 
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param pdes: The primary designation of an NEO for which to search.
     :param name: The name of an NEO for which to search.
     :param verbose: Whether to additionally print all of a matching NEO's close approaches.
-    :return: The matching `NearEarthObject`, or None if not found.
+    :param name_prefix: The start of the names of the NEOs for which to search.
+    :param max_edits: How many typos to tolerate in `pdes` or `name`.
+    :param after: The first date of close approaches to print.
+    :param before: The date before which to stop printing close approaches.
+    :param out: The stream to print to; defaults to `sys.stdout`.
+    :param err: The stream to print errors to; defaults to `sys.stderr`.
+    :return: The matching `NearEarthObject` (a list of them for `name_prefix`), or None if not found.
     """
-    # Fetch the NEO by primary designation or by name.
+    out, err = out or sys.stdout, err or sys.stderr
+
+    # Fetch the NEO by primary designation or by name, or the NEOs by the start of their names.
     if pdes:
         neo = database.get_neo_by_designation(pdes)
-    else:
+        neos = [neo] if neo else database.find_neos(pdes, by='designation', max_edits=max_edits)[:1]
+    elif name:
         neo = database.get_neo_by_name(name)
+        neos = [neo] if neo else database.find_neos(name, by='name', max_edits=max_edits)[:1]
+    else:
+        neos = database.find_neos(name_prefix, by='name', prefix=True)
 
     # Ensure that we have received an NEO.
-    if not neo:
-        print("No matching NEOs exist in the database.", file=sys.stderr)
+    if not neos:
+        print("No matching NEOs exist in the database.", file=err)
         return None
 
-    # Display information about this NEO, and optionally its close approaches if verbose.
-    print(neo)
-    if verbose:
-        for approach in neo.approaches:
-            print(f"- {approach}")
-    return neo
-
-
-def query(database, args):
+    # Display information about each NEO, and optionally its close approaches if verbose.
+    windowed = after is not None or before is not None
+    start = datetime.datetime.combine(after, datetime.time()) if after is not None else None
+    end = datetime.datetime.combine(before, datetime.time()) if before is not None else None
+    for neo in neos:
+        print(neo, file=out)
+        if windowed:
+            for approach in database.approaches_between(neo, start, end):
+                print(f"- {approach}", file=out)
+        elif verbose:
+            for approach in database.approaches_of(neo):
+                print(f"- {approach}", file=out)
+    return neos if not (pdes or name) else neos[0]
+
+
+def query(database, args, out=None, err=None):
     """Perform the `query` subcommand.
 
     Collection of filters with `create_filters` and supplies them to the
@@ -204,35 +361,180 @@ def query(database, args):
 
     If an output file not given, print results to stdout, limit to
     10 entries, if no limit is specified. If an output file is given, use 
-    file's extension to whether the file should hold CSV or JSON data, and
-    writes the results to the output file in that format.
+    file's extension to whether the file should hold CSV, JSON or NDJSON data,
+    and whether to compress it, and writes the results to the output file in
+    that format.
 
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param out: The stream to print results to; defaults to `sys.stdout`.
+    :param err: The stream to print errors to; defaults to `sys.stderr`.
     """
+    out, err = out or sys.stdout, err or sys.stderr
+
     # Construct a collection of filters from arguments supplied at the command line.
-    filters = create_filters(
-        date=args.date, start_date=args.start_date, end_date=args.end_date,
-        distance_min=args.distance_min, distance_max=args.distance_max,
-        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
-        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
-        hazardous=args.hazardous
-    )
+    filters = filters_from_args(args)
+    if args.count:
+        with metrics.stage('query'):
+            matches = database.count(filters)
+        print(matches, file=out)
+        return
+
     # Query the database with the collection of filters.
-    results = database.query(filters)
+    if args.vectorized and not vectorized.available():
+        print("The --vectorized option requires NumPy (pip install numpy).", file=err)
+        return
+    workers = args.workers if args.workers > 0 else parallel.default_workers()
+    # Printed results are limited to 10 entries if not specified.
+    max_results = args.limit or (None if args.outfile else 10)
+    results = database.query(filters, vectorized_scan=args.vectorized, workers=workers,
+                             sort_by=args.sort_by, descending=args.descending,
+                             limit=max_results)
+    results = metrics.timed(results, 'query')
 
     if not args.outfile:
         # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
-            print(result)
+        with metrics.stage('write'):
+            for result in limit(results, max_results):
+                print(result, file=out)
     else:
-        # Write the results to a file.
-        if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
-        elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
+        # Write the results to a file, in the format its suffix asks for.
+        writer = writer_for(args.outfile)
+        if writer is not None and args.pipeline:
+            with metrics.stage('write'):
+                write_pipelined(writer, limit(results, args.limit), args.outfile)
+        elif writer is not None:
+            with metrics.stage('write'):
+                writer(limit(results, args.limit), args.outfile)
         else:
-            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+            print("Please use an output file that ends with `.csv`, `.json`, `.ndjson` or "
+                  "`.jsonl`, optionally followed by `.gz`, `.bz2` or `.xz`, or with `.neocol`.",
+                  file=err)
+
+
+def stats(database, args, out=None):
+    """Perform the `stats` subcommand.
+
+    Summarize the close approaches matching the filters given on the command
+    line - their count, and the minimum, mean and maximum of their distance and
+    velocity - overall or for each group, and print the result as a table.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param out: The stream to print the table to; defaults to `sys.stdout`.
+    """
+    out = out or sys.stdout
+    with metrics.stage('query'):
+        summaries = database.aggregate(filters_from_args(args), group_by=args.group_by)
+    if args.group_by is None:
+        summaries = {'all': summaries}
+
+    print(f"{args.group_by or '':<14} {'count':>8} {'min au':>9} {'mean au':>9} {'max au':>9} "
+          f"{'min km/s':>9} {'mean km/s':>9} {'max km/s':>9}", file=out)
+    for group, summary in summaries.items():
+        if not summary.count:
+            print(f"{group!s:<14} {0:>8}", file=out)
+            continue
+        print(f"{group!s:<14} {summary.count:>8} {summary.distance_min:>9.4f} "
+              f"{summary.distance_mean:>9.4f} {summary.distance_max:>9.4f} "
+              f"{summary.velocity_min:>9.2f} {summary.velocity_mean:>9.2f} "
+              f"{summary.velocity_max:>9.2f}", file=out)
+
+
+def data_files(args, cwd):
+    """Return the resolved data files and storage layout a command asks for."""
+    return (cwd / args.neofile).resolve(), (cwd / args.cadfile).resolve(), args.columnar
+
+
+class ServedDatabase:
+    """The database a `serve` process answers from, reloaded when its data files change."""
+
+    def __init__(self, args):
+        """Load the database that `args` asks for, noting the state of its data files.
+
+        :param args: All arguments from the command line, as parsed by the top-level parser.
+        """
+        self.args = args
+        self.files = data_files(args, pathlib.Path.cwd())
+        self._lock = threading.Lock()
+        self._fingerprint = self._current_fingerprint()
+        self._database = self._load()
+
+    def _current_fingerprint(self):
+        return data_fingerprint(self.args.neofile, self.args.cadfile)
+
+    def _load(self):
+        return load_database(self.args.neofile, self.args.cadfile,
+                             use_snapshot=self.args.snapshot, columnar=self.args.columnar)
+
+    def current(self):
+        """Return the database, first reloading it if its data files have changed."""
+        fingerprint = self._current_fingerprint()
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                print("The data files have changed; reloading them.", file=sys.stderr)
+                self._database = self._load()
+                self._fingerprint = fingerprint
+            return self._database
+
+
+def run_served(served, parser, argv, cwd, out, err):
+    """Run a command forwarded to the `serve` subcommand.
+
+    Commands for other data files, or that a server does not answer, are
+    refused so that the client runs them itself. Relative output files are
+    written relative to the client's working directory. Scans run in this
+    process, since forking a pool from the threaded server could deadlock.
+
+    :param served: The `ServedDatabase` of the server.
+    :param parser: The top-level parser, to parse the forwarded arguments.
+    :param argv: The client's command-line arguments.
+    :param cwd: The client's working directory.
+    :param out: The stream to print results to.
+    :param err: The stream to print errors to.
+    :return: The exit status of the command.
+    """
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit:
+        raise server.Refused
+    cwd = pathlib.Path(cwd)
+    if args.cmd not in SERVED_COMMANDS or data_files(args, cwd) != served.files:
+        raise server.Refused
+    database = served.current()
+
+    if args.cmd == 'inspect':
+        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose,
+                name_prefix=args.name_prefix, max_edits=args.max_edits,
+                after=args.after, before=args.before, out=out, err=err)
+    elif args.cmd == 'query':
+        if args.outfile:
+            args.outfile = cwd / args.outfile
+        args.workers = 1
+        query(database, args, out=out, err=err)
+    else:
+        stats(database, args, out=out)
+    return 0
+
+
+def serve(parser, args):
+    """Perform the `serve` subcommand.
+
+    Load the database, then answer `inspect`, `query` and `stats` commands
+    sent by other invocations of this script over a Unix socket, several at a
+    time, until interrupted. The data files are checked before each command,
+    and reloaded if they have changed.
+
+    :param parser: The top-level parser, to parse forwarded arguments.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    handler = functools.partial(run_served, ServedDatabase(args), parser)
+    listener = server.Server(handler, args.socket)
+    print(f"Serving on {listener.path}. Press Ctrl-C to stop.", file=sys.stderr)
+    try:
+        listener.serve_forever()
+    except OSError as err:
+        print(err, file=sys.stderr)
 
 
 class NEOShell(cmd.Cmd):
@@ -309,7 +611,9 @@ class NEOShell(cmd.Cmd):
         # Run the `inspect` subcommand.
         inspect(self.db,
                 pdes=args.pdes, name=args.name,
-                verbose=args.verbose)
+                verbose=args.verbose,
+                name_prefix=args.name_prefix, max_edits=args.max_edits,
+                after=args.after, before=args.before)
 
     def do_q(self, arg):
         """Shorthand for `query`."""
@@ -363,19 +667,60 @@ class NEOShell(cmd.Cmd):
 def main():
     """Run the main script."""
     print("Welcome to the NEO close approach explorer!")
-    parser, inspect_parser, query_parser, filters, repel = make_parser()
+    parser, inspect_parser, filters, query_parser, repel, stats_parser = make_parser()
     args = parser.parse_args()
 
+    # Hand the command to a running server, if there is one, rather than loading the data.
+    if args.cmd in SERVED_COMMANDS and args.server and not (args.metrics or args.profile):
+        status = server.forward(sys.argv[1:], args.socket)
+        if status is not None:
+            sys.exit(status)
+
+    recorder = metrics.start() if args.metrics else None
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        run(args, parser, inspect_parser, query_parser)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if recorder is not None:
+            metrics.stop()
+            recorder.write(args.metrics)
+
+
+def run(args, parser, inspect_parser, query_parser):
+    """Load the database and run the chosen subcommand.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param parser: The top-level parser.
+    :param inspect_parser: The subparser for the `inspect` subcommand.
+    :param query_parser: The subparser for the `query` subcommand.
+    """
+    # The server loads (and reloads) the data itself.
+    if args.cmd == 'serve':
+        serve(parser, args)
+        return
+
     # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    database = load_database(args.neofile, args.cadfile,
+                             use_snapshot=args.snapshot, columnar=args.columnar)
 
     # Run the chosen subcommand.
     if args.cmd == 'inspect':
-        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
+        with metrics.stage('inspect'):
+            inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose,
+                    name_prefix=args.name_prefix, max_edits=args.max_edits,
+                    after=args.after, before=args.before)
     elif args.cmd == 'query':
         query(database, args)
+    elif args.cmd == 'stats':
+        stats(database, args)
     elif args.cmd == 'interactive':
         NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
 
+
 if __name__ == '__main__':
     main()
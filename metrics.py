@@ -0,0 +1,145 @@
+"""Time the stages of a run and count what its queries did.
+
+While a `Recorder` is active (between `start` and `stop`), the rest of the
+project reports to it: `stage(name)` times a block of code, `timed` times the
+production of each item of a lazy iterable (such as the stream of approaches
+read from the data file, or the results of a query), and `count` adds to a
+named counter. With no recorder active these cost next to nothing.
+
+Stages record wall-clock and CPU time. Times are exclusive: a stage nested
+inside another - as reading approaches is inside linking the database, since
+the approaches are streamed into it - is subtracted from the outer one, so the
+stages of a run add up to its total. CPU time is that of the whole process,
+including other threads but not worker processes.
+
+A report is a JSON document of the stages and counters, or a table of them.
+"""
+
+import collections
+import contextlib
+import json
+import sys
+import threading
+import time
+
+# The recorder that `stage`, `timed` and `count` report to, if any.
+_recorder = None
+
+# A context manager that does nothing, for `stage` while nothing is recorded.
+_NO_STAGE = contextlib.suppress()
+
+
+class Recorder:
+    """Wall-clock and CPU time per stage, and named counters."""
+
+    def __init__(self):
+        self.stages = {}  # name -> [calls, wall seconds, CPU seconds]
+        self.counters = collections.Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        """Start timing a stage on this thread; return its start times."""
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append([0.0, 0.0])  # Time spent in stages nested inside this one.
+        return time.perf_counter(), time.process_time()
+
+    def _exit(self, name, start, calls=1):
+        """Finish timing a stage on this thread, charging its exclusive time to `name`."""
+        wall = time.perf_counter() - start[0]
+        cpu = time.process_time() - start[1]
+        stack = self._local.stack
+        nested_wall, nested_cpu = stack.pop()
+        if stack:
+            stack[-1][0] += wall
+            stack[-1][1] += cpu
+        with self._lock:
+            totals = self.stages.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += calls
+            totals[1] += wall - nested_wall
+            totals[2] += cpu - nested_cpu
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one call of stage `name`."""
+        start = self._enter()
+        try:
+            yield
+        finally:
+            self._exit(name, start)
+
+    def timed(self, iterable, name):
+        """Yield the items of `iterable`, charging the time spent producing them to `name`."""
+        iterator = iter(iterable)
+        while True:
+            start = self._enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._exit(name, start, calls=0)
+                return
+            except BaseException:
+                self._exit(name, start, calls=0)
+                raise
+            self._exit(name, start)
+            yield item
+
+    def report(self):
+        """Return the stages and counters as a JSON-serializable dictionary."""
+        return {
+            'stages': {name: {'calls': calls, 'wall_s': wall, 'cpu_s': cpu}
+                       for name, (calls, wall, cpu) in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+    def format(self):
+        """Return the stages and counters as a table, for people."""
+        lines = [f"{'stage':<24} {'calls':>9} {'wall s':>10} {'cpu s':>10}"]
+        for name, (calls, wall, cpu) in self.stages.items():
+            lines.append(f"{name:<24} {calls:>9} {wall:>10.4f} {cpu:>10.4f}")
+        for name, value in self.counters.items():
+            lines.append(f"{name:<58} {value:>12}")
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """Write the report as JSON to `path`, or as a table to stderr if `path` is '-'."""
+        if str(path) == '-':
+            print(self.format(), file=sys.stderr)
+            return
+        with open(path, 'w') as outfile:
+            json.dump(self.report(), outfile, indent=4)
+
+
+def start():
+    """Start recording to a new `Recorder`, and return it."""
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+
+def stop():
+    """Stop recording, and return the `Recorder` that was active, if any."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def recorder():
+    """Return the active `Recorder`, or None."""
+    return _recorder
+
+
+def stage(name):
+    """Return a context manager timing its block as stage `name`, if recording."""
+    return _recorder.stage(name) if _recorder is not None else _NO_STAGE
+
+
+def timed(iterable, name):
+    """Return `iterable`, timing the production of its items as stage `name` if recording."""
+    return _recorder.timed(iterable, name) if _recorder is not None else iterable
+
+
+def count(name, n=1):
+    """Add `n` to the counter `name`, if recording."""
+    if _recorder is not None:
+        _recorder.counters[name] += n
@@ -16,7 +16,7 @@ data files from NASA, so these objects should be able to handle all of the
 quirks of the data set, such as missing names and unknown diameters.
 """
 
-from helpers import cd_to_datetime, datetime_to_str
+from helpers import fast_cd_to_datetime, datetime_to_str
 
 
 class NearEarthObject:
@@ -29,10 +29,17 @@ class NearEarthObject:
 
     A `NearEarthObject` also maintains a collection of its close approaches -
     initialized to an empty collection, but eventually populated in the
-    `NEODatabase` constructor."""
+    `NEODatabase` constructor.
+
+    Instances are slotted: with millions of them held in memory, dropping the
+    per-instance `__dict__` saves more than the attributes themselves cost."""
+    __slots__ = ('designation', 'name', 'diameter', 'hazardous', 'extra', 'approaches')
 
-    def __init__(self, designation='', name='', diameter=float('nan'), hazardous=''):
+    def __init__(self, designation='', name='', diameter=float('nan'), hazardous='', extra=None,
+                 **info):
         """Create a new `NearEarthObject`.
+        :param extra: A mapping of extra columns from the data file, which may share
+            names with the other parameters (e.g. a raw `diameter` column).
         :param info: A dictionary of excess keyword arguments supplied to the constructor.
         """
 
@@ -40,6 +47,8 @@ class NearEarthObject:
         self.name = str(name) if name else None
         self.diameter = float(diameter) if diameter else float('nan')
         self.hazardous = True if hazardous.lower() == "y" else False
+        # Any extra columns requested from the data file, or None if there are none.
+        self.extra = {**(extra or {}), **info} or None
 
         # empty initial collection of linked approaches.
         self.approaches = []
@@ -80,14 +89,18 @@ class CloseApproach:
     initially, this information (the NEO's primary designation) is saved in a
     private attribute, but the referenced NEO is eventually replaced in the
     `NEODatabase` constructor.
+
+    Like `NearEarthObject`, instances are slotted and carry no `__dict__`.
     """
+    __slots__ = ('designation', 'time', 'distance', 'velocity', 'neo')
+
     def __init__(self, designation='', time='',
         distance=float('nan'),velocity=float('nan'), neo=None):
         """ Create a new `CloseApproach`."""
         #Info arguments passed to constructor onto attributes. Values to match data types.
 
         self.designation = str(designation) if designation else None  #initially a string.
-        self.time = cd_to_datetime(time) if time else None #cd_to_datetime function attribute.
+        self.time = fast_cd_to_datetime(time) if time else None #cd_to_datetime function attribute.
         if not isinstance(distance, (float, int)):
             raise TypeError("Distance must be a float or int.")
         self.distance = float(distance)
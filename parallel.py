@@ -0,0 +1,74 @@
+"""Scan the close approaches of an `NEODatabase` across a pool of processes.
+
+The rows to scan are cut into contiguous partitions, several per worker, and
+each worker process runs the usual compiled scan over one partition at a time,
+sending back just the positions of its matching rows. Partitions are merged
+back in order, so results arrive in the same order as a serial scan.
+
+Workers are forked after the scan is set up, so they share the loaded data
+with the parent copy-on-write instead of receiving a pickled copy of it. Where
+the `fork` start method is unavailable, the scan runs serially instead.
+
+Because results are consumed partition by partition, a caller that stops
+early (as `filters.limit` does) closes the pool and abandons the remaining
+partitions.
+"""
+
+import itertools
+import multiprocessing
+import os
+from array import array
+
+# Partitions handed to each worker, so early-finishing workers keep busy.
+PARTITIONS_PER_WORKER = 4
+
+# Scans in progress, keyed by job number. Forked workers inherit this mapping.
+_JOBS = {}
+_JOB_NUMBERS = itertools.count()
+
+
+def default_workers():
+    """Return the number of CPUs this process may use."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _scan_partition(task):
+    """In a worker, scan one partition of a job and return its matching row positions."""
+    job, lo, hi = task
+    store, filters, rows, selectivity = _JOBS[job]
+    partition = range(lo, hi) if rows is None else rows[lo:hi]
+    return array('i', store.scan(filters, partition, selectivity=selectivity))
+
+
+def scan(store, filters, rows=None, workers=None, selectivity=None):
+    """Yield the row positions, in order, that pass every filter, using several processes.
+
+    :param store: An approach store from `storage`.
+    :param filters: A collection of `AttributeFilter`s.
+    :param rows: Row positions to consider, or None for every row.
+    :param workers: Number of worker processes; defaults to `default_workers()`.
+    :param selectivity: Passed on to `filters.order_filters`.
+    """
+    workers = workers or default_workers()
+    try:
+        context = multiprocessing.get_context('fork')
+    except ValueError:
+        context = None
+    if context is None or workers < 2:
+        yield from store.scan(filters, rows, selectivity=selectivity)
+        return
+
+    total = len(store) if rows is None else len(rows)
+    size = max(1, -(-total // (workers * PARTITIONS_PER_WORKER)))
+    job = next(_JOB_NUMBERS)
+    _JOBS[job] = (store, filters, rows, selectivity)
+    try:
+        with context.Pool(workers) as pool:
+            tasks = [(job, lo, min(lo + size, total)) for lo in range(0, total, size)]
+            for matches in pool.imap(_scan_partition, tasks):
+                yield from matches
+    finally:
+        del _JOBS[job]
@@ -0,0 +1,266 @@
+"""Serve commands from a database loaded once, over a local Unix socket.
+
+A `Server` listens on a Unix socket and hands each request - the command-line
+arguments of one `inspect`, `query` or `stats` command - to a handler running
+in a worker thread, so several requests are answered at once. Whatever the
+handler writes to its output and error streams is sent back line by line as it
+is produced, through a bounded queue: a handler that produces output faster
+than its client reads it waits rather than buffering without limit.
+
+`forward` is the client side. It sends a command to a running server and
+copies the reply to the local streams, or returns None when no server is
+listening (or the server refuses the command), so the caller can run the
+command itself instead.
+
+Every message is one line of UTF-8 text. A request is a JSON object with the
+arguments and the client's working directory. Each reply line starts with one
+character saying what it holds: a line of standard output, a line of standard
+error, the exit status, or a refusal.
+
+The socket lives in the user's runtime directory (`$XDG_RUNTIME_DIR`) or else
+in a directory under the temporary directory that only the user can enter.
+Clients only talk to a server run by the same user, since anyone else could
+answer with made-up results.
+"""
+
+import io
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+
+# The first character of each reply line.
+STDOUT, STDERR, EXIT, REFUSED = 'o', 'e', 'x', 'r'
+
+# Reply lines a handler may get ahead of its client before it has to wait.
+QUEUE_SIZE = 256
+
+
+class Refused(Exception):
+    """Raised by a handler for a request that the client should run itself."""
+
+
+def default_socket():
+    """Return the default path of the server's socket, one per user."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'neo.sock')
+    return os.path.join(tempfile.gettempdir(), f'neo-{_uid()}', 'neo.sock')
+
+
+def _uid():
+    return os.getuid() if hasattr(os, 'getuid') else 0
+
+
+def _is_own_socket(path):
+    """Return whether `path` is a socket owned by this user."""
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == _uid()
+
+
+def _connect(sock, path):
+    """Connect `sock` to the socket at `path`, if it belongs to a server run by this user.
+
+    :raise OSError: If the socket cannot be connected to, or belongs to another user.
+    """
+    if not _is_own_socket(path):
+        raise PermissionError(f"{path} is not a socket owned by this user.")
+    sock.connect(path)
+    if hasattr(socket, 'SO_PEERCRED'):
+        credentials = struct.Struct('3i')
+        _, uid, _ = credentials.unpack(
+            sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, credentials.size))
+        if uid != _uid():
+            raise PermissionError(f"The server on {path} is run by another user.")
+
+
+class _LineWriter(io.TextIOBase):
+    """A text stream that passes each complete line it is given to `send`."""
+
+    def __init__(self, kind, send):
+        super().__init__()
+        self._kind = kind
+        self._send = send
+        self._pending = ''
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self._send(self._kind + line)
+        return len(text)
+
+    def flush(self):
+        if self._pending:
+            line, self._pending = self._pending, ''
+            self._send(self._kind + line)
+
+
+class Server:
+    """Answer requests on a Unix socket by calling `handler` in worker threads.
+
+    `handler(argv, cwd, out, err)` runs one command, writing to the text
+    streams `out` and `err`, and returns its exit status. It may raise
+    `Refused` to send the command back to the client.
+    """
+
+    def __init__(self, handler, path=None):
+        self.handler = handler
+        self.path = path or default_socket()
+        self._loop = None
+
+    def serve_forever(self, ready=None):
+        """Listen until `shutdown` is called or the process is interrupted.
+
+        :param ready: An optional `threading.Event`, set once the socket is listening.
+        """
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError("Serving requires Unix domain sockets, which this platform lacks.")
+        if is_running(self.path):
+            raise OSError(f"A server is already listening on {self.path}.")
+        if os.path.lexists(self.path):
+            if not stat.S_ISSOCK(os.lstat(self.path).st_mode):
+                raise OSError(f"{self.path} exists and is not a socket.")
+            os.unlink(self.path)  # Left behind by a server that did not shut down cleanly.
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, mode=0o700)
+
+        import asyncio  # Only the server needs it; clients stay quick to start.
+        self._loop = loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        umask = os.umask(0o177)  # Create the socket for this user only, with no window.
+        try:
+            server = loop.run_until_complete(
+                asyncio.start_unix_server(self._answer, path=self.path))
+        finally:
+            os.umask(umask)
+        if ready is not None:
+            ready.set()
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            loop.close()
+            if _is_own_socket(self.path):
+                os.unlink(self.path)
+
+    def shutdown(self):
+        """Stop `serve_forever`, from any thread."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _answer(self, reader, writer):
+        """Run one request in a worker thread, streaming its output back as it comes."""
+        import asyncio
+        loop = asyncio.get_event_loop()
+        lines = asyncio.Queue(QUEUE_SIZE)
+        client_gone = threading.Event()
+
+        def send(line):
+            # Called from the worker thread; waits while the queue is full.
+            if client_gone.is_set():
+                raise BrokenPipeError("The client has disconnected.")
+            asyncio.run_coroutine_threadsafe(lines.put(line), loop).result()
+
+        def work(request):
+            out, err = _LineWriter(STDOUT, send), _LineWriter(STDERR, send)
+            try:
+                status = self.handler(request['argv'], request['cwd'], out, err)
+                out.flush()
+                err.flush()
+                reply = f'{EXIT}{status or 0}'
+            except Refused:
+                reply = REFUSED
+            except BrokenPipeError:
+                reply = None
+            except Exception as error:  # Report the failure to the client; keep serving.
+                try:
+                    err.write(f"{type(error).__name__}: {error}\n")
+                    err.flush()
+                    reply = f'{EXIT}1'
+                except BrokenPipeError:
+                    reply = None
+            asyncio.run_coroutine_threadsafe(lines.put(reply), loop).result()
+
+        try:
+            request = json.loads(await reader.readline())
+        except ValueError:
+            writer.close()
+            return
+        done = loop.run_in_executor(None, work, request)
+        while True:
+            line = await lines.get()
+            if line is not None and not client_gone.is_set():
+                try:
+                    writer.write(line.encode('utf-8') + b'\n')
+                    await writer.drain()
+                except ConnectionError:
+                    client_gone.set()
+            if line is None or line[0] in (EXIT, REFUSED):
+                break
+        await done
+        writer.close()
+
+
+def is_running(path=None):
+    """Return whether a server run by this user is listening on the socket at `path`."""
+    if not hasattr(socket, 'AF_UNIX'):
+        return False
+    with socket.socket(socket.AF_UNIX) as sock:
+        try:
+            _connect(sock, path or default_socket())
+        except OSError:
+            return False
+    return True
+
+
+def forward(argv, path=None, cwd=None, out=None, err=None):
+    """Run a command on a running server, copying its output as it arrives.
+
+    Only a server run by this user is sent the command.
+
+    :param argv: The command-line arguments of the command.
+    :param path: The server's socket; defaults to `default_socket()`.
+    :param cwd: The directory relative paths in `argv` are resolved against.
+    :param out: The stream for the command's output; defaults to `sys.stdout`.
+    :param err: The stream for the command's errors; defaults to `sys.stderr`.
+    :return: The command's exit status, or None if no server ran it.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    out, err = out or sys.stdout, err or sys.stderr
+    request = json.dumps({'argv': list(argv), 'cwd': cwd or os.getcwd()})
+    with socket.socket(socket.AF_UNIX) as sock:
+        try:
+            _connect(sock, path or default_socket())
+            sock.sendall(request.encode('utf-8') + b'\n')
+        except OSError:
+            return None
+        answered = False
+        with sock.makefile('r', encoding='utf-8', newline='\n') as reply:
+            for line in reply:
+                kind, text = line[:1], line[1:].rstrip('\n')
+                if kind == STDOUT:
+                    print(text, file=out)
+                elif kind == STDERR:
+                    print(text, file=err)
+                elif kind == EXIT:
+                    return int(text)
+                elif kind == REFUSED:
+                    return None
+                answered = True
+    # The server went away mid-reply; only retry locally if nothing was shown yet.
+    return 1 if answered else None
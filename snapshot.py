@@ -0,0 +1,197 @@
+"""Cache a fully-linked `NEODatabase` on disk as a binary snapshot.
+
+Loading the data files means parsing every row of `neos.csv` and `cad.json`,
+building model objects, cross-linking them and sorting the indexes. The
+`load_database` function does this once, then writes a snapshot of the result
+next to the close approach file. Later calls read that back instead, as long as
+its key still matches.
+
+A snapshot is not pickled: it holds the typed arrays of
+`NEODatabase.to_columns` - approach columns, per-NEO timelines and sorted
+indexes - read straight into `array`s, after a JSON header with the key, the
+NEOs' attributes and the layout of the arrays. Nothing in it can run code. With
+`--columnar` the arrays are adopted as they are, so a load takes milliseconds.
+The default layout must still build a `CloseApproach` for every row, which
+takes around a second per few hundred thousand approaches; use `--columnar`
+where start-up time matters.
+
+The key records the size, modification time and a digest of the head and tail
+of each data file, together with a digest of this project's source files, so
+editing either the data or the code invalidates the snapshot. Snapshots are
+only read if they belong to the current user and nobody else may write to
+them.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import stat
+import struct
+import sys
+from array import array
+
+import metrics
+from extract import load_neos, iter_approaches
+from database import NEODatabase
+from models import NearEarthObject
+
+# Bump when the snapshot layout changes incompatibly.
+SNAPSHOT_VERSION = 2
+SNAPSHOT_MAGIC = b'NEODB\x00'
+SNAPSHOT_SUFFIX = '.snapshot'
+
+# The length of the JSON header, which follows the magic bytes.
+_HEADER_LENGTH = struct.Struct('<Q')
+
+# Bytes hashed from each end of a data file when fingerprinting it.
+_FINGERPRINT_BYTES = 1 << 16
+
+_SOURCE_ROOT = pathlib.Path(__file__).parent.resolve()
+
+
+def snapshot_path(cad_json_path, columnar=False):
+    """Return the path of the snapshot kept alongside a close approach file."""
+    cad_json_path = pathlib.Path(cad_json_path)
+    layout = '.columnar' if columnar else ''
+    return cad_json_path.with_name(cad_json_path.name + layout + SNAPSHOT_SUFFIX)
+
+
+def _file_fingerprint(path):
+    """Fingerprint a data file by its size, mtime and the bytes at either end."""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read(_FINGERPRINT_BYTES))
+        if stat.st_size > _FINGERPRINT_BYTES:
+            f.seek(max(_FINGERPRINT_BYTES, stat.st_size - _FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+
+
+def _source_fingerprint():
+    """Digest this project's Python sources, which decide what the snapshot holds."""
+    digest = hashlib.sha256()
+    for path in sorted(_SOURCE_ROOT.glob('*.py')):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def data_fingerprint(neo_csv_path, cad_json_path):
+    """Return a fingerprint of the data files that changes whenever they do."""
+    return _file_fingerprint(neo_csv_path), _file_fingerprint(cad_json_path)
+
+
+def snapshot_key(neo_csv_path, cad_json_path, columnar=False):
+    """Return the key identifying a snapshot of the given data files."""
+    return (SNAPSHOT_VERSION, sys.byteorder, _source_fingerprint(), columnar,
+            *data_fingerprint(neo_csv_path, cad_json_path))
+
+
+def _is_trusted(f):
+    """Return whether the open file `f` is owned by this user and writable by no one else."""
+    info = os.fstat(f.fileno())
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        return False
+    return not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def read_snapshot(path, key, columnar=False):
+    """Return the database stored at `path`, or None if it is missing, stale or untrusted."""
+    try:
+        with open(path, 'rb') as f:
+            if not _is_trusted(f):
+                print(f"Ignoring snapshot {path}: it is not owned by this user, or others "
+                      f"may write to it.", file=sys.stderr)
+                return None
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                return None
+            length, = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+            header = json.loads(f.read(length).decode('utf-8'))
+            if header['key'] != json.loads(json.dumps(key)):
+                return None
+            columns = {}
+            for name, typecode, count in header['arrays']:
+                columns[name] = column = array(typecode)
+                column.fromfile(f, count)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, KeyError, TypeError, struct.error) as err:
+        print(f"Ignoring unreadable snapshot {path}: {err}", file=sys.stderr)
+        return None
+    neos = [_neo_from_record(record) for record in header['neos']]
+    return NEODatabase.from_columns(neos, columns, columnar=columnar)
+
+
+def write_snapshot(path, key, database):
+    """Atomically write `database` to `path` under `key`."""
+    neos, columns = database.to_columns()
+    header = json.dumps({
+        'key': key,
+        'neos': [_neo_record(neo) for neo in neos],
+        'arrays': [(name, column.typecode, len(column)) for name, column in columns.items()],
+    }).encode('utf-8')
+    path = pathlib.Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        # Never group- or world-writable, whatever the umask, or it would not be read back.
+        with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644), 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            for column in columns.values():
+                column.tofile(f)
+        os.replace(tmp_path, path)
+    except OSError as err:
+        print(f"Unable to write snapshot {path}: {err}", file=sys.stderr)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _neo_record(neo):
+    """Return the attributes of a `NearEarthObject` as a JSON-serializable list."""
+    return [neo.designation, neo.name, neo.diameter, neo.hazardous, neo.extra]
+
+
+def _neo_from_record(record):
+    """Rebuild a `NearEarthObject` from the list returned by `_neo_record`."""
+    designation, name, diameter, hazardous, extra = record
+    neo = NearEarthObject(designation=designation, name=name, extra=extra)
+    neo.diameter = diameter
+    neo.hazardous = hazardous
+    return neo
+
+
+def load_database(neo_csv_path, cad_json_path, use_snapshot=True, columnar=False):
+    """Load an `NEODatabase`, preferring a current snapshot over the data files.
+
+    :param neo_csv_path: Path to the CSV file of near-Earth objects.
+    :param cad_json_path: Path to the JSON file of close approach data.
+    :param use_snapshot: Whether to read and refresh the snapshot at all.
+    :param columnar: Whether the database stores approaches in typed columns.
+    :return: A linked `NEODatabase`.
+    """
+    if not use_snapshot:
+        return _load(neo_csv_path, cad_json_path, columnar)
+
+    path = snapshot_path(cad_json_path, columnar)
+    key = snapshot_key(neo_csv_path, cad_json_path, columnar)
+    with metrics.stage('load_snapshot'):
+        database = read_snapshot(path, key, columnar)
+    if database is None:
+        database = _load(neo_csv_path, cad_json_path, columnar)
+        with metrics.stage('write_snapshot'):
+            write_snapshot(path, key, database)
+    return database
+
+
+def _load(neo_csv_path, cad_json_path, columnar):
+    """Build an `NEODatabase` from the data files, timing each stage if recording."""
+    with metrics.stage('load_neos'):
+        neos = load_neos(neo_csv_path)
+    approaches = metrics.timed(iter_approaches(cad_json_path), 'load_approaches')
+    with metrics.stage('link'):
+        return NEODatabase(neos, approaches, columnar=columnar)
@@ -0,0 +1,232 @@
+"""Storage backends for the close approaches held by an `NEODatabase`.
+
+Both backends address approaches by their row position (the order in which
+they were loaded) and offer the same small interface, so the database can scan
+and index either one:
+
+- `ApproachList` keeps the `CloseApproach` objects themselves, linked to their
+  NEOs. This is the default.
+- `ApproachTable` keeps time, distance and velocity in typed `array` columns,
+  with an integer index per row into the table's list of NEOs. A
+  `CloseApproach` is only built for a row when that row is asked for.
+
+Filters are evaluated through `getter(field)`, which returns a function from a
+row position to that row's value of `field`, and `encode(field, value)`, which
+turns a filter's reference value into something comparable with it. Fields are
+the names in `FIELDS`; `date` values are compared as proleptic ordinals. The
+NEO's `designation` can be read too, for grouping.
+
+`scan` runs a whole collection of filters at once through a predicate compiled
+by `filters.compile_filters` (or, for the table, straight over its columns).
+"""
+
+import datetime
+from array import array
+
+from filters import compile_filters, compile_predicate, order_filters
+from models import CloseApproach
+
+# The fields every backend can read for a row.
+FIELDS = ('time', 'date', 'distance', 'velocity', 'diameter', 'hazardous')
+# Those of them that are attributes of the approaching `NearEarthObject`.
+NEO_FIELDS = ('diameter', 'hazardous')
+
+_MINUTES_PER_DAY = 24 * 60
+# The start of proleptic ordinal day 1, which is minute `_MINUTES_PER_DAY`.
+_FIRST_DAY = datetime.datetime(1, 1, 1)
+
+
+class ApproachList(list):
+    """A list of linked `CloseApproach` objects, addressed by row position."""
+
+    columnar = False
+
+    def add(self, approach, neo):
+        """Link `approach` to `neo` and append it as the next row."""
+        approach.neo = neo
+        neo.approaches.append(approach)
+        self.append(approach)
+
+    def approach(self, row):
+        """Return the `CloseApproach` at a row position."""
+        return self[row]
+
+    def getter(self, field):
+        """Return a function from a row position to that row's value of `field`."""
+        if field == 'time':
+            return lambda row: self[row].time
+        if field == 'date':
+            return lambda row: self[row].time.toordinal()
+        if field in ('distance', 'velocity'):
+            return lambda row: getattr(self[row], field)
+        if field in ('diameter', 'hazardous', 'designation'):
+            return lambda row: getattr(self[row].neo, field)
+        raise KeyError(field)
+
+    @staticmethod
+    def encode(field, value):
+        """Return a filter value in the form compared against `getter(field)`."""
+        if field == 'date':
+            return value.toordinal()
+        return value
+
+    def scan(self, filters, rows=None, selectivity=None, on_reject=None):
+        """Yield the row positions, in order, whose approaches pass every filter.
+
+        :param filters: A collection of `AttributeFilter`s.
+        :param rows: Row positions to consider, or None for every row.
+        :param selectivity: Passed on to `filters.order_filters`.
+        :param on_reject: Passed on to `filters.compile_filters`.
+        """
+        predicate = compile_filters(filters, selectivity, on_reject)
+        if rows is None:
+            for row, approach in enumerate(self):
+                if predicate(approach):
+                    yield row
+        else:
+            for row in rows:
+                if predicate(self[row]):
+                    yield row
+
+
+class ApproachTable:
+    """Close approaches stored column by column, with NEOs referenced by index.
+
+    `time` holds minutes since 0001-01-01 00:00 (UTC), `distance` and
+    `velocity` are doubles, and `neo` holds an index into `neos`. The NEO
+    attributes that filters read, diameter and hazardous, are kept in columns
+    of their own, one entry per NEO.
+    """
+
+    columnar = True
+
+    def __init__(self, neos):
+        self.neos = list(neos)
+        self.neo_index = {neo.designation: index for index, neo in enumerate(self.neos)}
+        self.neo_diameter = array('d', (neo.diameter for neo in self.neos))
+        self.neo_hazardous = array('b', (neo.hazardous for neo in self.neos))
+
+        self.time = array('q')
+        self.distance = array('d')
+        self.velocity = array('d')
+        self.neo = array('i')
+
+    def __len__(self):
+        return len(self.time)
+
+    def __iter__(self):
+        """Yield a freshly-built `CloseApproach` for every row, in order, as `approach` would."""
+        neos = self.neos
+        for minutes, distance, velocity, neo in zip(self.time, self.distance, self.velocity,
+                                                    self.neo):
+            neo = neos[neo]
+            approach = CloseApproach(designation=neo.designation, distance=distance,
+                                     velocity=velocity, neo=neo)
+            approach.time = minutes_to_datetime(minutes)
+            yield approach
+
+    def add(self, approach, neo):
+        """Append the values of `approach`, made by `neo`, as the next row."""
+        self.time.append(datetime_to_minutes(approach.time))
+        self.distance.append(approach.distance)
+        self.velocity.append(approach.velocity)
+        self.neo.append(self.neo_index[neo.designation])
+
+    def approach(self, row):
+        """Build the `CloseApproach` at a row position, linked to its NEO.
+
+        The approach is not added to its NEO's `approaches`; each call builds a
+        new object.
+        """
+        neo = self.neos[self.neo[row]]
+        approach = CloseApproach(designation=neo.designation, distance=self.distance[row],
+                                 velocity=self.velocity[row], neo=neo)
+        approach.time = minutes_to_datetime(self.time[row])
+        return approach
+
+    def getter(self, field):
+        """Return a function from a row position to that row's value of `field`."""
+        if field == 'time':
+            return self.time.__getitem__
+        if field == 'date':
+            time = self.time
+            return lambda row: time[row] // _MINUTES_PER_DAY
+        if field == 'distance':
+            return self.distance.__getitem__
+        if field == 'velocity':
+            return self.velocity.__getitem__
+        if field == 'diameter':
+            neo, neo_diameter = self.neo, self.neo_diameter
+            return lambda row: neo_diameter[neo[row]]
+        if field == 'hazardous':
+            neo, neo_hazardous = self.neo, self.neo_hazardous
+            return lambda row: bool(neo_hazardous[neo[row]])
+        if field == 'designation':
+            neo, neos = self.neo, self.neos
+            return lambda row: neos[neo[row]].designation
+        raise KeyError(field)
+
+    @staticmethod
+    def encode(field, value):
+        """Return a filter value in the form compared against `getter(field)`."""
+        if field == 'time':
+            return datetime_to_minutes(value)
+        if field == 'date':
+            return value.toordinal()
+        return value
+
+    def compile(self, filters, selectivity=None, on_reject=None):
+        """Fuse filters into one predicate on a row position.
+
+        Filters on one of `FIELDS` are compiled to direct column reads; any
+        other filter is called on a `CloseApproach` built for the row. See
+        `filters.compile_filters` for `on_reject`.
+        """
+        namespace = {
+            'time': self.time, 'distance': self.distance, 'velocity': self.velocity,
+            'neo': self.neo, 'neo_diameter': self.neo_diameter,
+            'neo_hazardous': self.neo_hazardous, 'approach': self.approach,
+        }
+        terms = []
+        ordered = order_filters(filters, selectivity)
+        for i, f in enumerate(ordered):
+            field = getattr(f, 'field', None)
+            if field in _COLUMN_SOURCE:
+                terms.append((_COLUMN_SOURCE[field], f.op, self.encode(field, f.value)))
+            else:
+                namespace[f'_f{i}'] = f
+                terms.append((f'_f{i}(approach(row))', None, None))
+        on_reject = None if on_reject is None else [on_reject[f] for f in ordered]
+        return compile_predicate(terms, 'row', namespace, on_reject)
+
+    def scan(self, filters, rows=None, selectivity=None, on_reject=None):
+        """Yield the row positions, in order, that pass every filter.
+
+        :param filters: A collection of `AttributeFilter`s.
+        :param rows: Row positions to consider, or None for every row.
+        :param selectivity: Passed on to `filters.order_filters`.
+        :param on_reject: Passed on to `filters.compile_filters`.
+        """
+        rows = range(len(self)) if rows is None else rows
+        return filter(self.compile(filters, selectivity, on_reject), rows)
+
+
+# Python source reading each field of `row` from the columns of an `ApproachTable`.
+_COLUMN_SOURCE = {
+    'time': 'time[row]',
+    'date': f'time[row] // {_MINUTES_PER_DAY}',
+    'distance': 'distance[row]',
+    'velocity': 'velocity[row]',
+    'diameter': 'neo_diameter[neo[row]]',
+    'hazardous': 'neo_hazardous[neo[row]]',
+}
+
+
+def datetime_to_minutes(dt):
+    """Convert a naive datetime into whole minutes since 0001-01-01 00:00."""
+    return dt.toordinal() * _MINUTES_PER_DAY + dt.hour * 60 + dt.minute
+
+
+def minutes_to_datetime(minutes):
+    """Convert minutes since 0001-01-01 00:00 back into a naive datetime."""
+    return _FIRST_DAY + datetime.timedelta(minutes=minutes - _MINUTES_PER_DAY)
@@ -0,0 +1,34 @@
+"""Data files and helpers shared by the tests that compare approach stores."""
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def key(approach):
+    """Identify an approach by value, as the columnar backend builds new objects."""
+    return (approach.neo.designation, approach.time, approach.distance, approach.velocity)
+
+
+class BackendTestCase(unittest.TestCase):
+    """Load the test data once into each approach store.
+
+    `db` keeps approaches as objects, in the order of `approaches`, and
+    `columnar` keeps them in an `ApproachTable`. Subclasses set `cache_size`
+    to 0 when every query must really run.
+    """
+    cache_size = 128
+
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches,
+                             cache_size=cls.cache_size)
+        cls.columnar = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE),
+                                   columnar=True, cache_size=cls.cache_size)
@@ -0,0 +1,106 @@
+"""Check that counts and aggregates summarize exactly the approaches a query returns.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_aggregate
+"""
+import collections
+import datetime
+import math
+import pathlib
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestAggregate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.columnar = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE),
+                                   columnar=True)
+
+    def assertSummarizes(self, summary, approaches):
+        distances = [a.distance for a in approaches]
+        velocities = [a.velocity for a in approaches]
+        self.assertEqual(summary.count, len(approaches))
+        self.assertEqual(summary.distance_min, min(distances))
+        self.assertEqual(summary.distance_max, max(distances))
+        self.assertTrue(math.isclose(summary.distance_mean, sum(distances) / len(distances)))
+        self.assertEqual(summary.velocity_min, min(velocities))
+        self.assertEqual(summary.velocity_max, max(velocities))
+        self.assertTrue(math.isclose(summary.velocity_mean, sum(velocities) / len(velocities)))
+
+    def test_ungrouped_summary(self):
+        filters = create_filters(hazardous=True, distance_max=0.3)
+        expected = list(self.db.query(filters))
+        for db in (self.db, self.columnar):
+            self.assertSummarizes(db.aggregate(filters), expected)
+
+    def test_grouped_summaries(self):
+        filters = create_filters(start_date=datetime.date(2020, 11, 1), velocity_min=10)
+        approaches = list(self.db.query(filters))
+        groupings = {
+            'year': lambda a: a.time.year,
+            'month': lambda a: a.time.strftime('%Y-%m'),
+            'designation': lambda a: a.neo.designation,
+        }
+        for group_by, group_of in groupings.items():
+            expected = collections.defaultdict(list)
+            for approach in approaches:
+                expected[group_of(approach)].append(approach)
+            for db in (self.db, self.columnar):
+                groups = db.aggregate(filters, group_by=group_by)
+                self.assertEqual(list(groups), sorted(expected), msg=group_by)
+                for group, summary in groups.items():
+                    self.assertSummarizes(summary, expected[group])
+
+    def test_no_approaches_are_built(self):
+        with unittest.mock.patch.object(self.columnar._approaches, 'approach') as mock_build:
+            self.columnar.aggregate(create_filters(velocity_min=5), group_by='month')
+            mock_build.assert_not_called()
+
+    def test_empty_summary(self):
+        summary = self.db.aggregate(create_filters(date=datetime.date(1900, 1, 1)))
+        self.assertEqual(summary.count, 0)
+        self.assertTrue(math.isnan(summary.distance_mean))
+
+    def test_unknown_grouping_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.db.aggregate(group_by='weekday')
+
+
+class TestCount(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_counts_match_query(self):
+        for criteria in ({}, {'date': datetime.date(2020, 3, 2)},
+                         {'start_date': datetime.date(2020, 2, 1),
+                          'end_date': datetime.date(2020, 2, 29)},
+                         {'distance_max': 0.05}, {'hazardous': True, 'diameter_min': 0.5},
+                         {'distance_max': 0.05, 'start_date': datetime.date(2020, 6, 1)}):
+            filters = create_filters(**criteria)
+            self.assertEqual(self.db.count(filters), len(list(self.db.query(filters))),
+                             msg=criteria)
+
+    def test_single_field_ranges_are_counted_from_index(self):
+        filters = create_filters(start_date=datetime.date(2020, 2, 1),
+                                 end_date=datetime.date(2020, 2, 29))
+        with unittest.mock.patch.object(self.db, '_matches') as mock_matches:
+            self.db.count(filters)
+            self.db.count(create_filters(hazardous=True))
+            mock_matches.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Check that repeated queries are served from the LRU query result cache.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_cache
+"""
+import datetime
+import pathlib
+import pickle
+import unittest
+import unittest.mock
+
+from cache import QueryCache
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_key_ignores_filter_order(self):
+        filters = create_filters(distance_max=0.1, hazardous=True)
+        self.assertEqual(QueryCache.key(filters), QueryCache.key(filters[::-1]))
+        self.assertEqual(QueryCache.key(filters),
+                         QueryCache.key(create_filters(hazardous=True, distance_max=0.1)))
+        self.assertNotEqual(QueryCache.key(filters),
+                            QueryCache.key(create_filters(distance_max=0.2, hazardous=True)))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QueryCache(maxsize=2)
+        cache.put('a', [1])
+        cache.put('b', [2])
+        cache.get('a')
+        cache.put('c', [3])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(list(cache.get('a')), [1])
+        self.assertEqual(list(cache.get('c')), [3])
+
+    def test_entries_are_evicted_to_stay_within_bytes(self):
+        cache = QueryCache(maxsize=10, maxbytes=2000)
+        cache.put('a', range(300))
+        cache.put('b', range(300))
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.info().nbytes, 2000)
+        cache.put('huge', range(10000))
+        self.assertIsNone(cache.get('huge'))
+
+    def test_pickled_cache_keeps_limits_only(self):
+        cache = QueryCache(maxsize=3, maxbytes=1000)
+        cache.put('a', [1])
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((copy.maxsize, copy.maxbytes, len(copy)), (3, 1000, 0))
+
+
+class TestDatabaseQueryCache(unittest.TestCase):
+    def setUp(self):
+        self.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_repeated_query_hits_cache(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1), velocity_min=20)
+        first = list(self.db.query(filters))
+        with unittest.mock.patch.object(self.db, '_scan') as mock_scan:
+            second = list(self.db.query(filters[::-1]))
+            mock_scan.assert_not_called()
+        self.assertEqual(first, second)
+        info = self.db.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+    def test_abandoned_query_is_not_cached(self):
+        filters = create_filters(velocity_min=5)
+        list(limit(self.db.query(filters), 3))
+        self.assertEqual(self.db.cache_info().currsize, 0)
+        self.assertEqual(len(list(self.db.query(filters))),
+                         sum(1 for a in self.db._approaches if a.velocity >= 5))
+
+    def test_disabled_cache_stores_nothing(self):
+        db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE), cache_size=0)
+        list(db.query(create_filters(hazardous=True)))
+        self.assertEqual(db.cache_info().currsize, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
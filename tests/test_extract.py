@@ -12,11 +12,14 @@ These tests should pass when Task 2 is complete.
 """
 import collections.abc
 import datetime
+import io
+import json
 import pathlib
 import math
+import tempfile
 import unittest
 
-from extract import load_neos, load_approaches
+from extract import load_neos, load_approaches, iter_approaches, _iter_json_rows
 from models import NearEarthObject, CloseApproach
 
 
@@ -77,6 +80,27 @@ class TestLoadNEOs(unittest.TestCase):
         self.assertEqual(neo.diameter, 0.6)
         self.assertEqual(neo.hazardous, True)
 
+    def test_extra_fields_are_loaded_on_request(self):
+        self.assertIsNone(self.neos_by_designation['2101'].extra)
+
+        neos = load_neos(TEST_NEO_FILE, extra_fields=('H', 'albedo', 'moid', 'class'))
+        adonis = next(neo for neo in neos if neo.designation == '2101')
+        self.assertEqual(adonis.name, 'Adonis')
+        self.assertIsInstance(adonis.extra['H'], float)
+        self.assertIsInstance(adonis.extra['moid'], float)
+        self.assertEqual(adonis.extra['class'], 'APO')
+
+    def test_extra_fields_may_share_names_with_neo_attributes(self):
+        neos = load_neos(TEST_NEO_FILE, extra_fields=('diameter', 'name'))
+        adonis = next(neo for neo in neos if neo.designation == '2101')
+        self.assertEqual(adonis.name, 'Adonis')
+        self.assertEqual(adonis.diameter, 0.6)
+        self.assertEqual(adonis.extra, {'diameter': 0.6, 'name': 'Adonis'})
+
+    def test_unknown_extra_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            load_neos(TEST_NEO_FILE, extra_fields=('not_a_column',))
+
 
 class TestLoadApproaches(unittest.TestCase):
     @classmethod
@@ -118,5 +142,41 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsInstance(approach.velocity, float)
 
 
+class TestIterApproaches(unittest.TestCase):
+    def test_iter_approaches_is_a_stream(self):
+        stream = iter_approaches(TEST_CAD_FILE)
+        self.assertIsInstance(stream, collections.abc.Iterator)
+        self.assertIsInstance(next(stream), CloseApproach)
+
+    def test_iter_approaches_matches_json_load(self):
+        with open(TEST_CAD_FILE) as infile:
+            rows = json.load(infile)['data']
+        # A tiny chunk size forces values to straddle chunk boundaries.
+        approaches = list(iter_approaches(TEST_CAD_FILE, chunk_size=7))
+        self.assertEqual(len(approaches), len(rows))
+        for approach, row in zip(approaches, rows):
+            self.assertEqual(approach.designation, row[0])
+            self.assertEqual(approach.distance, float(row[4]))
+            self.assertEqual(approach.velocity, float(row[7]))
+
+    def test_iter_approaches_skips_members_around_data(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'cad.json'
+            path.write_text('{"count": 1, "data": [["433", "1", "2458849.5", '
+                            '"2020-Jan-01 00:54", "0.5", "0", "0", "7.25"]], '
+                            '"fields": ["des", "data"]}')
+            approaches = list(iter_approaches(path))
+        self.assertEqual(len(approaches), 1)
+        self.assertEqual(approaches[0].designation, '433')
+        self.assertEqual(approaches[0].velocity, 7.25)
+
+
+    def test_numbers_split_across_chunks(self):
+        text = '{"count": 1.5e3, "data": [[1, -2.25E-1], [3e2, 4]], "n": 2.5}'
+        for chunk_size in range(1, len(text) + 1):
+            rows = list(_iter_json_rows(io.StringIO(text), 'data', chunk_size))
+            self.assertEqual(rows, [[1, -0.225], [300.0, 4]], msg=chunk_size)
+
+
 if __name__ == '__main__':
     unittest.main()
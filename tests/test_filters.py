@@ -0,0 +1,87 @@
+"""Check that compiled predicates agree with the filters they were built from.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_filters
+"""
+import collections
+import datetime
+import itertools
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import (create_filters, compile_filters, order_filters,
+                     AttributeFilter, DateFilter, DistanceFilter, HazardousFilter)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class NameLengthFilter(AttributeFilter):
+    """A filter with no inlinable expression, as a user might write one."""
+    @classmethod
+    def get(cls, approach):
+        return len(approach.neo.fullname)
+
+
+class TestCompileFilters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def assertCompiledAgrees(self, filters):
+        predicate = compile_filters(filters)
+        for approach in self.approaches:
+            self.assertEqual(predicate(approach), all(f(approach) for f in filters),
+                             msg=f"{filters} on {approach!r}")
+
+    def test_no_filters_accept_everything(self):
+        predicate = compile_filters([])
+        self.assertTrue(all(predicate(approach) for approach in self.approaches))
+
+    def test_created_filters_agree(self):
+        self.assertCompiledAgrees(create_filters(
+            start_date=datetime.date(2020, 2, 1), end_date=datetime.date(2020, 8, 1),
+            distance_max=0.3, velocity_min=10, diameter_min=0.1, hazardous=False))
+        self.assertCompiledAgrees(create_filters(date=datetime.date(2020, 3, 2)))
+
+    def test_uninlinable_filters_agree(self):
+        self.assertCompiledAgrees([NameLengthFilter(operator.gt, 12),
+                                   DistanceFilter(operator.ne, 0.1),
+                                   DistanceFilter(lambda a, b: a * 2 < b, 0.2)])
+
+    def test_rejections_are_reported_to_the_first_failing_filter(self):
+        filters = create_filters(distance_max=0.1, hazardous=True) + [NameLengthFilter(operator.gt, 12)]
+        rejected = {f: itertools.count(1) for f in filters}
+        predicate = compile_filters(filters, on_reject={f: c.__next__ for f, c in rejected.items()})
+        passed = sum(1 for approach in self.approaches if predicate(approach))
+        self.assertEqual(passed, sum(1 for approach in self.approaches
+                                     if all(f(approach) for f in filters)))
+        expected = collections.Counter()
+        for approach in self.approaches:
+            failing = next((f for f in order_filters(filters) if not f(approach)), None)
+            if failing is not None:
+                expected[failing] += 1
+        self.assertEqual({f: next(c) - 1 for f, c in rejected.items()},
+                         {f: expected[f] for f in filters})
+
+    def test_cheap_selective_filters_go_first(self):
+        date = DateFilter(operator.eq, datetime.date(2020, 1, 1))
+        distance = DistanceFilter(operator.le, 0.1)
+        hazardous = HazardousFilter(operator.eq, True)
+        custom = NameLengthFilter(operator.gt, 12)
+        self.assertEqual(order_filters([custom, hazardous, distance, date]),
+                         [distance, hazardous, date, custom])
+        # Measured selectivities override the guesses.
+        measured = {date: 0.99, distance: 0.01}
+        self.assertEqual(order_filters([date, distance], measured.get), [distance, date])
+
+
+if __name__ == '__main__':
+    unittest.main()
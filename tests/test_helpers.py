@@ -0,0 +1,49 @@
+"""Check that the fast calendar date parser agrees with `cd_to_datetime`.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_helpers
+"""
+import json
+import pathlib
+import unittest
+
+from helpers import cd_to_datetime, fast_cd_to_datetime
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestFastCdToDatetime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(TEST_CAD_FILE) as infile:
+            cls.calendar_dates = [row[3] for row in json.load(infile)['data']]
+
+    def test_matches_cd_to_datetime_over_test_dataset(self):
+        self.assertGreater(len(self.calendar_dates), 0)
+        for calendar_date in self.calendar_dates:
+            self.assertEqual(fast_cd_to_datetime(calendar_date), cd_to_datetime(calendar_date),
+                             msg=calendar_date)
+
+    def test_matches_cd_to_datetime_on_every_month(self):
+        for month in ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'):
+            calendar_date = f"1999-{month}-28 23:59"
+            self.assertEqual(fast_cd_to_datetime(calendar_date), cd_to_datetime(calendar_date))
+
+    def test_unusual_layouts_fall_back_to_strptime(self):
+        for calendar_date in ('2020-jan-01 00:54', '2020-Jan-1 0:54'):
+            self.assertEqual(fast_cd_to_datetime(calendar_date), cd_to_datetime(calendar_date))
+
+    def test_invalid_dates_raise_like_strptime(self):
+        for calendar_date in ('2020-Feb-30 00:00', '2020-Foo-01 00:00', '2020-Jan-+1 00:00'):
+            with self.assertRaises(ValueError):
+                cd_to_datetime(calendar_date)
+            with self.assertRaises(ValueError):
+                fast_cd_to_datetime(calendar_date)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""Check that sorted indexes and the query planner select the rows a full scan would.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_index
+"""
+import datetime
+import operator
+import pathlib
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, DateFilter
+from index import SortedIndex
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestDateIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+        cls.index = SortedIndex(cls.db._approaches, 'date')
+
+    def test_index_covers_every_row_in_date_order(self):
+        self.assertEqual(sorted(self.index.rows), list(range(len(self.approaches))))
+        dates = [self.approaches[row].time.date() for row in self.index.rows]
+        self.assertEqual(dates, sorted(dates))
+
+    def test_spans_match_brute_force(self):
+        date = datetime.date(2020, 3, 2)
+        for op in (operator.eq, operator.lt, operator.le, operator.gt, operator.ge):
+            expected = [row for row, approach in enumerate(self.approaches)
+                        if op(approach.time.date(), date)]
+            received = self.index.rows_in(*self.index.span(op, date))
+            self.assertEqual(expected, received, msg=op.__name__)
+
+    def test_contradictory_range_is_empty(self):
+        filters = create_filters(start_date=datetime.date(2020, 6, 1),
+                                 end_date=datetime.date(2020, 5, 1))
+        lo, hi = self.index.intersect(filters)
+        self.assertEqual(lo, hi)
+        self.assertEqual(list(self.db.query(filters)), [])
+
+    def test_date_query_only_scans_matching_range(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2), distance_max=0.1)
+        store = self.db._approaches
+        with unittest.mock.patch.object(store, 'scan', wraps=store.scan) as mock_scan:
+            results = list(self.db.query(filters))
+        residual, rows = mock_scan.call_args.args
+        self.assertEqual([type(f) for f in residual], [type(filters[1])])
+        self.assertNotIn(DateFilter, [type(f) for f in residual])
+        self.assertLess(len(rows), len(self.approaches) / 10)
+        self.assertGreater(len(results), 0)
+
+
+class TestQueryPlanner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), cls.approaches)
+
+    def test_database_indexes_date_distance_and_velocity(self):
+        self.assertEqual(set(self.db._indexes), {'date', 'distance', 'velocity'})
+
+    def test_most_selective_index_drives_scan(self):
+        filters = create_filters(start_date=datetime.date(2020, 1, 1), distance_max=0.0005,
+                                 velocity_min=5)
+        rows, residual = self.db._plan(filters)
+        expected = [row for row, approach in enumerate(self.approaches)
+                    if approach.distance <= 0.0005]
+        self.assertEqual(rows, expected)
+        self.assertEqual({f.field for f in residual}, {'date', 'velocity'})
+
+    def test_unselective_criteria_fall_back_to_full_scan(self):
+        filters = create_filters(velocity_min=1, hazardous=False)
+        rows, residual = self.db._plan(filters)
+        self.assertIsNone(rows)
+        self.assertEqual(len(residual), len(filters))
+
+    def test_neo_criteria_are_pushed_down_to_neos(self):
+        filters = create_filters(diameter_min=1, hazardous=True, velocity_min=5)
+        rows, residual = self.db._plan(filters)
+        expected = [row for row, approach in enumerate(self.approaches)
+                    if approach.neo.diameter >= 1 and approach.neo.hazardous]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(rows, expected)
+        self.assertEqual([f.field for f in residual], ['velocity'])
+
+    def test_pushed_down_query_matches_brute_force(self):
+        filters = create_filters(diameter_max=0.5, hazardous=True, distance_max=0.2)
+        expected = [approach for approach in self.approaches
+                    if approach.neo.diameter <= 0.5 and approach.neo.hazardous
+                    and approach.distance <= 0.2]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+    def test_planned_queries_match_brute_force(self):
+        filters = create_filters(distance_min=0.01, distance_max=0.02, velocity_max=10)
+        expected = [approach for approach in self.approaches
+                    if 0.01 <= approach.distance <= 0.02 and approach.velocity <= 10]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(list(self.db.query(filters)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Check that stage timings and query counters are recorded while metrics are on.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_metrics
+"""
+import contextlib
+import datetime
+import io
+import json
+import pathlib
+import tempfile
+import time
+import unittest
+
+import metrics
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        self.recorder = metrics.start()
+        self.addCleanup(metrics.stop)
+
+    def test_nothing_is_recorded_when_stopped(self):
+        metrics.stop()
+        with metrics.stage('idle'):
+            pass
+        metrics.count('idle')
+        self.assertEqual(list(metrics.timed([1, 2], 'idle')), [1, 2])
+        self.assertEqual(self.recorder.report(), {'stages': {}, 'counters': {}})
+
+    def test_nested_stages_are_exclusive(self):
+        with metrics.stage('outer'):
+            time.sleep(0.02)
+            with metrics.stage('inner'):
+                time.sleep(0.05)
+        stages = self.recorder.report()['stages']
+        self.assertGreaterEqual(stages['inner']['wall_s'], 0.05)
+        self.assertLess(stages['outer']['wall_s'], 0.05)
+        self.assertGreaterEqual(stages['outer']['wall_s'], 0.02)
+
+    def test_timed_charges_each_item(self):
+        def slow():
+            for i in range(3):
+                time.sleep(0.01)
+                yield i
+
+        with metrics.stage('consume'):
+            self.assertEqual(list(metrics.timed(slow(), 'produce')), [0, 1, 2])
+        stages = self.recorder.report()['stages']
+        self.assertEqual(stages['produce']['calls'], 3)
+        self.assertGreaterEqual(stages['produce']['wall_s'], 0.03)
+        self.assertLess(stages['consume']['wall_s'], 0.03)
+
+    def test_reports_are_written_as_json_or_a_table(self):
+        metrics.count('things', 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'metrics.json'
+            self.recorder.write(path)
+            self.assertEqual(json.loads(path.read_text())['counters'], {'things': 2})
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            self.recorder.write('-')
+        self.assertIn('things', err.getvalue())
+
+
+class TestQueryCounters(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE),
+                             cache_size=0)
+
+    def setUp(self):
+        self.recorder = metrics.start()
+        self.addCleanup(metrics.stop)
+
+    def test_rows_are_counted(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), distance_max=0.05,
+                                 hazardous=True)
+        metrics.stop()
+        expected = list(self.db.query(filters))
+        metrics.start()
+        received = list(self.db.query(filters))
+        counters = metrics.recorder().counters
+        self.assertEqual(expected, received)
+        self.assertEqual(counters['rows matched'], len(received))
+        rejections = sum(value for name, value in counters.items() if name.startswith('rejected'))
+        self.assertEqual(counters['rows scanned'], rejections + len(received))
+        self.assertTrue(any(name.startswith('rejected by') for name in counters))
+
+    def test_columnar_rows_are_counted(self):
+        db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE),
+                         columnar=True, cache_size=0)
+        filters = create_filters(distance_max=0.05, velocity_min=10)
+        received = list(db.query(filters))
+        counters = self.recorder.counters
+        rejections = sum(value for name, value in counters.items() if name.startswith('rejected'))
+        self.assertEqual(counters['rows matched'], len(received))
+        self.assertEqual(counters['rows scanned'], rejections + len(received))
+
+    def test_filters_answered_by_the_planner_are_recorded(self):
+        filters = create_filters(date=datetime.date(2020, 1, 1), distance_max=0.4)
+        list(self.db.query(filters))
+        counters = self.recorder.counters
+        self.assertEqual(counters[f'answered by the planner: {filters[0]!r}'], 1)
+        self.assertNotIn(f'rejected by {filters[0]!r}', counters)
+        self.assertEqual(counters['rows scanned'], counters[f'rejected by {filters[1]!r}']
+                         + counters['rows matched'])
+
+    def test_early_exit_counts_only_examined_rows(self):
+        list(self.db.query(create_filters(hazardous=False), limit=5))
+        counters = self.recorder.counters
+        self.assertEqual(counters['rows matched'], 5)
+        self.assertLess(counters['rows scanned'], len(self.db._approaches))
+
+
+if __name__ == '__main__':
+    unittest.main()
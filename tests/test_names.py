@@ -0,0 +1,111 @@
+"""Check case-insensitive, prefix and fuzzy lookups of NEOs by name and designation.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_names
+"""
+import contextlib
+import io
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from index import NameIndex, bounded_edit_distance
+from main import inspect
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestEditDistance(unittest.TestCase):
+    def test_distances_within_the_limit(self):
+        self.assertEqual(bounded_edit_distance('apophis', 'apophis', 2), 0)
+        self.assertEqual(bounded_edit_distance('apophis', 'apofis', 2), 2)
+        self.assertEqual(bounded_edit_distance('eros', 'eris', 1), 1)
+
+    def test_distances_beyond_the_limit(self):
+        self.assertIsNone(bounded_edit_distance('apophis', 'apofis', 1))
+        self.assertIsNone(bounded_edit_distance('eros', 'hermes', 2))
+
+
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = NameIndex({'Hermes': 'hermes', 'Halley': 'halley',
+                                'Hathor': 'hathor', 'Eros': 'eros'})
+
+    def test_exact_ignores_case(self):
+        self.assertEqual(self.index.exact('HALLEY'), ['halley'])
+        self.assertEqual(self.index.exact('Hal'), [])
+
+    def test_prefix_returns_matches_in_key_order(self):
+        self.assertEqual(self.index.prefix('ha'), ['halley', 'hathor'])
+        self.assertEqual(self.index.prefix('H'), ['halley', 'hathor', 'hermes'])
+        self.assertEqual(self.index.prefix('x'), [])
+
+    def test_similar_returns_closest_first(self):
+        self.assertEqual(self.index.similar('Hally', 1), ['halley'])
+        self.assertEqual(self.index.similar('Hermos', 1), ['hermes'])
+        self.assertEqual(self.index.similar('Hermos', 2), ['hermes', 'eros'])
+        self.assertEqual(self.index.similar('zzz', 1), [])
+
+    def test_similar_agrees_with_the_edit_distance_of_every_key(self):
+        names = ['2020 AB', '2020 AB1', '2020 AB12', '2020 AC', '2020 ab', '2020 B', '2019 AB',
+                 '2020', 'AB 2020', '']
+        index = NameIndex({name: name for name in names})
+        for text in ('2020 AB', '2020 A', '2021 AB1', 'ab', ''):
+            for max_edits in (1, 2, 3):
+                distances = ((bounded_edit_distance(text.casefold(), key, max_edits), key)
+                             for key in index.keys)
+                expected = sorted((distance, key) for distance, key in distances
+                                  if distance is not None)
+                self.assertEqual([index.keys[index.neos.index(neo)]
+                                  for neo in index.similar(text, max_edits)],
+                                 [key for _, key in expected], msg=(text, max_edits))
+
+
+class TestFindNEOs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_find_by_name_ignores_case(self):
+        self.assertEqual(self.db.find_neos('aPoPhIs'), [self.db.get_neo_by_name('Apophis')])
+
+    def test_find_by_designation(self):
+        neo = self.db.get_neo_by_designation('99942')
+        self.assertEqual(self.db.find_neos('99942', by='designation'), [neo])
+
+    def test_find_by_prefix(self):
+        neos = self.db.find_neos('ap', prefix=True)
+        self.assertIn(self.db.get_neo_by_name('Apophis'), neos)
+        self.assertTrue(all(neo.name.lower().startswith('ap') for neo in neos))
+
+    def test_find_with_typos(self):
+        self.assertEqual(self.db.find_neos('Apofis', max_edits=1), [])
+        self.assertIn(self.db.get_neo_by_name('Apophis'), self.db.find_neos('Apofis', max_edits=2))
+        self.assertEqual(self.db.find_neos('Apophs', max_edits=1),
+                         [self.db.get_neo_by_name('Apophis')])
+        self.assertEqual(self.db.find_neos('Apofis'), [])
+
+    def test_unknown_key_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.db.find_neos('Apophis', by='diameter')
+
+    def test_inspect_falls_back_to_a_case_insensitive_match(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            neo = inspect(self.db, name='apophis')
+        self.assertEqual(neo, self.db.get_neo_by_name('Apophis'))
+
+    def test_inspect_by_prefix_prints_every_match(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            neos = inspect(self.db, name_prefix='ap')
+        self.assertEqual(neos, self.db.find_neos('ap', prefix=True))
+        self.assertEqual(len(output.getvalue().splitlines()), len(neos))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Check that a query partitioned across processes answers like a serial one.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_parallel
+"""
+import datetime
+import pathlib
+import tempfile
+import unittest
+
+import parallel
+from filters import create_filters, limit
+from tests.support import BackendTestCase, key
+from write import write_pipelined, write_to_csv
+
+
+class TestParallelQuery(BackendTestCase):
+    cache_size = 0
+
+    def test_parallel_matches_serial_in_order(self):
+        for criteria in ({}, {'velocity_min': 10, 'hazardous': False},
+                         {'start_date': datetime.date(2020, 9, 1), 'diameter_min': 0.1}):
+            filters = create_filters(**criteria)
+            for db in (self.db, self.columnar):
+                expected = [key(a) for a in db.query(filters)]
+                received = [key(a) for a in db.query(filters, workers=3)]
+                self.assertEqual(expected, received, msg=criteria)
+
+    def test_limit_stops_early(self):
+        filters = create_filters(velocity_min=1)
+        received = list(limit(self.db.query(filters, workers=2), 5))
+        self.assertEqual(received, list(limit(self.db.query(filters), 5)))
+        self.assertEqual(parallel._JOBS, {})
+
+    def test_single_worker_runs_serially(self):
+        filters = create_filters(hazardous=True)
+        rows = list(parallel.scan(self.db._approaches, filters, workers=1))
+        self.assertEqual(rows, list(self.db._approaches.scan(filters)))
+
+    def test_pipelined_writes_match_serial_writes(self):
+        # The scan forks its workers before the pipelined writer thread starts.
+        filters = create_filters(velocity_min=10)
+        with tempfile.TemporaryDirectory() as tmp:
+            expected = pathlib.Path(tmp) / 'serial.csv'
+            received = pathlib.Path(tmp) / 'piped.csv'
+            write_to_csv(self.db.query(filters), expected)
+            write_pipelined(write_to_csv, self.db.query(filters, workers=2), received,
+                            batch_size=16)
+            self.assertEqual(expected.read_text(), received.read_text())
+        self.assertEqual(parallel._JOBS, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""Check that a query server answers forwarded commands like a local run would.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_server
+"""
+import contextlib
+import functools
+import io
+import os
+import pathlib
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import parallel
+import server
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from main import ServedDatabase, make_parser, query, run_served
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "Unix domain sockets are unavailable.")
+class TestServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.parser = make_parser()[0]
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, 'neo.sock')
+        cls.data_args = ['--neofile', str(TEST_NEO_FILE), '--cadfile', str(TEST_CAD_FILE),
+                         '--no-snapshot']
+        served = ServedDatabase(cls.parser.parse_args(cls.data_args))
+        cls.server = server.Server(functools.partial(run_served, served, cls.parser), cls.path)
+        ready = threading.Event()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, args=(ready,))
+        cls.thread.start()
+        ready.wait()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join()
+        cls.tmp.cleanup()
+
+    def forward(self, *argv):
+        out, err = io.StringIO(), io.StringIO()
+        status = server.forward(self.data_args + list(argv), self.path, out=out, err=err)
+        return status, out.getvalue(), err.getvalue()
+
+    def test_server_is_running(self):
+        self.assertTrue(server.is_running(self.path))
+        self.assertFalse(server.is_running(os.path.join(self.tmp.name, 'missing.sock')))
+
+    def test_query_matches_a_local_run(self):
+        argv = ['query', '--date', '2020-01-01', '--limit', '5']
+        expected = io.StringIO()
+        query(self.db, self.parser.parse_args(self.data_args + argv), out=expected)
+        self.assertEqual(self.forward(*argv), (0, expected.getvalue(), ''))
+
+    def test_queries_do_not_fork_workers(self):
+        argv = ['query', '--start-date', '2020-01-01', '--limit', '5']
+        expected = io.StringIO()
+        query(self.db, self.parser.parse_args(self.data_args + argv), out=expected)
+        with mock.patch.object(parallel, 'scan', side_effect=AssertionError("forked")):
+            self.assertEqual(self.forward(*argv, '-j', '4'), (0, expected.getvalue(), ''))
+
+    def test_inspect_reports_errors_on_stderr(self):
+        status, out, err = self.forward('inspect', '--pdes', 'not-a-designation')
+        self.assertEqual((status, out), (0, ''))
+        self.assertIn("No matching NEOs", err)
+
+    def test_other_data_files_are_refused(self):
+        argv = ['--cadfile', 'elsewhere.json', 'query', '--date', '2020-01-01']
+        self.assertIsNone(server.forward(argv, self.path, out=io.StringIO()))
+
+    def test_requests_are_served_concurrently(self):
+        results = [None] * 8
+
+        def run(i):
+            results[i] = self.forward('query', '--start-date', '2020-01-01', '--limit', str(i + 1))
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i, (status, out, _) in enumerate(results):
+            self.assertEqual(status, 0)
+            self.assertEqual(len(out.splitlines()), i + 1)
+
+    def test_no_server(self):
+        self.assertIsNone(server.forward(['query'], os.path.join(self.tmp.name, 'missing.sock')))
+
+    def test_sockets_of_other_users_are_not_used(self):
+        with mock.patch.object(server, '_uid', return_value=os.getuid() + 1):
+            self.assertFalse(server.is_running(self.path))
+            self.assertIsNone(server.forward(['query'], self.path, out=io.StringIO()))
+
+    def test_only_sockets_are_connected_to(self):
+        path = os.path.join(self.tmp.name, 'results.csv')
+        pathlib.Path(path).write_text("data\n")
+        self.assertIsNone(server.forward(['query'], path, out=io.StringIO()))
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "Unix domain sockets are unavailable.")
+class TestSocketPath(unittest.TestCase):
+    def test_default_socket_is_in_the_runtime_directory(self):
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': '/run/user/1000'}):
+            self.assertEqual(server.default_socket(), '/run/user/1000/neo.sock')
+
+    def test_default_socket_is_in_a_private_directory(self):
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': ''}):
+            path = server.default_socket()
+        self.assertEqual(os.path.dirname(os.path.dirname(path)), tempfile.gettempdir())
+        self.assertNotEqual(os.path.dirname(path), tempfile.gettempdir())
+
+    def test_serving_creates_a_private_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'private', 'neo.sock')
+            listener = server.Server(lambda *args: 0, path)
+            ready = threading.Event()
+            thread = threading.Thread(target=listener.serve_forever, args=(ready,))
+            thread.start()
+            ready.wait()
+            try:
+                self.assertEqual(os.stat(os.path.dirname(path)).st_mode & 0o777, 0o700)
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+                self.assertEqual(server.forward(['query'], path, out=io.StringIO()), 0)
+            finally:
+                listener.shutdown()
+                thread.join()
+
+    def test_other_files_are_not_replaced(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'results.csv'
+            path.write_text("data\n")
+            with self.assertRaises(OSError):
+                server.Server(lambda *args: 0, str(path)).serve_forever()
+            self.assertEqual(path.read_text(), "data\n")
+
+
+class TestServedDatabase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cadfile = pathlib.Path(tmp.name) / 'cad.json'
+        shutil.copy(TEST_CAD_FILE, self.cadfile)
+        self.args = make_parser()[0].parse_args(
+            ['--neofile', str(TEST_NEO_FILE), '--cadfile', str(self.cadfile), '--no-snapshot'])
+
+    def test_unchanged_data_is_not_reloaded(self):
+        served = ServedDatabase(self.args)
+        self.assertIs(served.current(), served.current())
+
+    def test_changed_data_is_reloaded(self):
+        served = ServedDatabase(self.args)
+        before = served.current()
+        self.assertTrue(before._approaches)
+
+        self.cadfile.write_text('{"signature": {"version": "1.5"}, "count": 0, "fields": '
+                                '["des", "orbit_id", "jd", "cd", "dist", "dist_min", "dist_max", '
+                                '"v_rel", "v_inf", "t_sigma_f", "h"], "data": []}')
+        with contextlib.redirect_stderr(io.StringIO()):
+            after = served.current()
+        self.assertIsNot(after, before)
+        self.assertFalse(after._approaches)
+
+
+class TestClientImports(unittest.TestCase):
+    def test_asyncio_is_not_imported_by_clients(self):
+        code = "import sys, main; print('asyncio' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], cwd=TESTS_ROOT.parent,
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+class TestLineWriter(unittest.TestCase):
+    def test_lines_are_sent_whole(self):
+        sent = []
+        stream = server._LineWriter(server.STDOUT, sent.append)
+        with contextlib.redirect_stdout(stream):
+            print("one", end='')
+            print(" two")
+            print("three\nfour", end='')
+        stream.flush()
+        self.assertEqual(sent, ['oone two', 'othree', 'ofour'])
+
+
+if __name__ == '__main__':
+    unittest.main()
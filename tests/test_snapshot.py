@@ -0,0 +1,128 @@
+"""Check that a loaded `NEODatabase` round-trips through its on-disk snapshot.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_snapshot
+"""
+import contextlib
+import datetime
+import io
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import snapshot
+from filters import create_filters
+from snapshot import load_database, snapshot_path
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = pathlib.Path(tmp.name)
+        self.neofile = self.root / 'neos.csv'
+        self.cadfile = self.root / 'cad.json'
+        shutil.copy(TEST_NEO_FILE, self.neofile)
+        shutil.copy(TEST_CAD_FILE, self.cadfile)
+
+    def test_first_load_writes_snapshot_next_to_data(self):
+        load_database(self.neofile, self.cadfile)
+        self.assertTrue(snapshot_path(self.cadfile).exists())
+        self.assertEqual(snapshot_path(self.cadfile).parent, self.root)
+
+    def test_second_load_reads_snapshot(self):
+        first = load_database(self.neofile, self.cadfile)
+        with unittest.mock.patch.object(snapshot, 'iter_approaches') as mock_iter:
+            second = load_database(self.neofile, self.cadfile)
+            mock_iter.assert_not_called()
+
+        self.assertEqual(len(second._approaches), len(first._approaches))
+        self.assertIsNotNone(second.get_neo_by_designation('1865'))
+        for approach in second._approaches:
+            self.assertIn(approach, approach.neo.approaches)
+
+    def test_snapshot_matches_a_fresh_load(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1), distance_max=0.1)
+        after = datetime.datetime(2020, 6, 1)
+        for columnar in (False, True):
+            with self.subTest(columnar=columnar):
+                fresh = load_database(self.neofile, self.cadfile, use_snapshot=False,
+                                      columnar=columnar)
+                load_database(self.neofile, self.cadfile, columnar=columnar)
+                with unittest.mock.patch.object(snapshot, 'iter_approaches') as mock_iter:
+                    loaded = load_database(self.neofile, self.cadfile, columnar=columnar)
+                    mock_iter.assert_not_called()
+
+                for kwargs in ({}, {'sort_by': 'distance', 'limit': 10}):
+                    self.assertEqual(list(map(str, loaded.query(filters, **kwargs))),
+                                     list(map(str, fresh.query(filters, **kwargs))))
+                self.assertEqual(loaded.count(filters), fresh.count(filters))
+                for neo in fresh.find_neos('halley') + fresh.find_neos('2020', prefix=True)[:20]:
+                    other, = loaded.find_neos(neo.designation, by='designation')
+                    self.assertEqual(repr(other), repr(neo))
+                    self.assertEqual(list(map(str, loaded.approaches_of(other))),
+                                     list(map(str, fresh.approaches_of(neo))))
+                    self.assertEqual(str(loaded.next_approach(other, after)),
+                                     str(fresh.next_approach(neo, after)))
+
+    def test_changed_data_invalidates_snapshot(self):
+        load_database(self.neofile, self.cadfile)
+        stat = os.stat(self.cadfile)
+        os.utime(self.cadfile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        with unittest.mock.patch.object(snapshot, 'iter_approaches',
+                                        wraps=snapshot.iter_approaches) as mock_iter:
+            load_database(self.neofile, self.cadfile)
+            mock_iter.assert_called_once()
+
+    def plant_snapshot(self, mode):
+        """Write a snapshot that creates a directory when unpickled; return that directory."""
+        marker = self.root / 'planted'
+
+        class Payload:
+            def __reduce__(self):
+                return os.mkdir, (str(marker),)
+
+        path = snapshot_path(self.cadfile)
+        path.write_bytes(snapshot.SNAPSHOT_MAGIC + pickle.dumps(Payload()))
+        path.chmod(mode)
+        return marker
+
+    def test_snapshots_writable_by_others_are_not_read(self):
+        marker = self.plant_snapshot(0o666)
+        with contextlib.redirect_stderr(io.StringIO()) as err:
+            database = load_database(self.neofile, self.cadfile)
+        self.assertFalse(marker.exists())
+        self.assertIn("Ignoring snapshot", err.getvalue())
+        self.assertIsNotNone(database.get_neo_by_designation('1865'))
+
+    def test_snapshots_are_not_unpickled(self):
+        marker = self.plant_snapshot(0o644)
+        with contextlib.redirect_stderr(io.StringIO()):
+            load_database(self.neofile, self.cadfile)
+        self.assertFalse(marker.exists())
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "File ownership is not available.")
+    def test_snapshots_of_other_users_are_not_read(self):
+        marker = self.plant_snapshot(0o644)
+        with unittest.mock.patch.object(os, 'getuid', return_value=os.getuid() + 1), \
+                contextlib.redirect_stderr(io.StringIO()):
+            load_database(self.neofile, self.cadfile)
+        self.assertFalse(marker.exists())
+
+    def test_disabled_snapshot_is_not_written(self):
+        load_database(self.neofile, self.cadfile, use_snapshot=False)
+        self.assertFalse(snapshot_path(self.cadfile).exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
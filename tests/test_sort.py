@@ -0,0 +1,55 @@
+"""Check that sorted and top-k queries order matches like a full sort would.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sort
+"""
+import math
+import unittest
+
+from database import SORT_FIELDS
+from filters import create_filters
+from tests.support import BackendTestCase, key
+
+
+def value_of(approach, field):
+    return approach.neo.diameter if field == 'diameter' else getattr(approach, field)
+
+
+class TestSortedQuery(BackendTestCase):
+    def expected(self, criteria, field, descending, limit):
+        matches = list(self.db.query(create_filters(**criteria)))
+        # NaN is the only value unequal to itself.
+        known = [a for a in matches if value_of(a, field) == value_of(a, field)]
+        unknown = [a for a in matches if value_of(a, field) != value_of(a, field)]
+        ordered = sorted(known, key=lambda a: value_of(a, field), reverse=descending) + unknown
+        return [key(a) for a in ordered[:limit]]
+
+    def test_top_k_matches_full_sort(self):
+        for criteria in ({}, {'hazardous': True}, {'distance_max': 0.01}):
+            for field in SORT_FIELDS:
+                for descending in (False, True):
+                    for limit in (None, 1, 20):
+                        for db in (self.db, self.columnar):
+                            received = [key(a) for a in db.query(
+                                create_filters(**criteria), sort_by=field,
+                                descending=descending, limit=limit)]
+                            self.assertEqual(
+                                received, self.expected(criteria, field, descending, limit),
+                                msg=(criteria, field, descending, limit))
+
+    def test_unknown_diameters_sort_last(self):
+        results = list(self.db.query(sort_by='diameter', descending=True))
+        self.assertFalse(math.isnan(results[0].neo.diameter))
+        self.assertTrue(math.isnan(results[-1].neo.diameter))
+
+    def test_unsortable_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            list(self.db.query(sort_by='name'))
+
+    def test_limit_without_sort_keeps_load_order(self):
+        self.assertEqual(list(self.db.query(limit=3)), self.approaches[:3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Check that the columnar `ApproachTable` backend answers like the object list.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_storage
+"""
+import datetime
+import pickle
+import unittest
+
+from filters import create_filters
+from storage import ApproachTable, datetime_to_minutes, minutes_to_datetime
+from tests.support import BackendTestCase, key
+
+
+# A spread of criteria, alone and combined, to compare backends with.
+CRITERIA = (
+    {},
+    {'date': datetime.date(2020, 3, 2)},
+    {'start_date': datetime.date(2020, 4, 1), 'end_date': datetime.date(2020, 6, 30)},
+    {'distance_max': 0.025},
+    {'distance_min': 0.4, 'velocity_max': 5},
+    {'velocity_min': 30},
+    {'diameter_min': 0.5, 'diameter_max': 2},
+    {'hazardous': True},
+    {'hazardous': False, 'start_date': datetime.date(2020, 12, 1)},
+    {'date': datetime.date(2020, 3, 14), 'velocity_max': 25, 'diameter_min': 0.5,
+     'hazardous': True},
+)
+
+
+class TestApproachTable(BackendTestCase):
+
+    def test_columnar_database_uses_table(self):
+        self.assertIsInstance(self.columnar._approaches, ApproachTable)
+        self.assertEqual(len(self.columnar._approaches), len(self.db._approaches))
+
+    def test_minutes_round_trip(self):
+        for approach in self.db._approaches:
+            self.assertEqual(minutes_to_datetime(datetime_to_minutes(approach.time)),
+                             approach.time)
+
+    def test_queries_match_object_backend(self):
+        for criteria in CRITERIA:
+            filters = create_filters(**criteria)
+            expected = [key(approach) for approach in self.db.query(filters)]
+            received = [key(approach) for approach in self.columnar.query(filters)]
+            self.assertEqual(expected, received, msg=criteria)
+
+    def test_approaches_of_are_built_lazily(self):
+        neo = self.columnar.get_neo_by_designation('1865')
+        self.assertEqual(neo.approaches, [])
+        approaches = self.columnar.approaches_of(neo)
+        expected = self.db.approaches_of(self.db.get_neo_by_designation('1865'))
+        self.assertGreater(len(approaches), 0)
+        self.assertEqual([key(a) for a in approaches], [key(a) for a in expected])
+        for approach in approaches:
+            self.assertIs(approach.neo, neo)
+
+    def test_table_pickles(self):
+        table = pickle.loads(pickle.dumps(self.columnar._approaches))
+        self.assertEqual(key(table.approach(0)), key(self.columnar._approaches.approach(0)))
+
+
+if __name__ == '__main__':
+    unittest.main()
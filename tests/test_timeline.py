@@ -0,0 +1,77 @@
+"""Check that each NEO's approaches are time-ordered and searchable by time.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_timeline
+"""
+import contextlib
+import datetime
+import io
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from main import inspect
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestTimeline(unittest.TestCase):
+    columnar = False
+
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE),
+                             columnar=cls.columnar)
+        cls.neo = max(cls.db._neos, key=lambda neo: len(cls.db.approaches_of(neo)))
+        cls.times = [approach.time for approach in cls.db.approaches_of(cls.neo)]
+
+    def test_approaches_are_in_time_order(self):
+        self.assertGreater(len(self.times), 2)
+        for neo in self.db._neos:
+            times = [approach.time for approach in self.db.approaches_of(neo)]
+            self.assertEqual(times, sorted(times))
+
+    def test_next_approach(self):
+        first, second = self.times[:2]
+        self.assertEqual(self.db.next_approach(self.neo, first - datetime.timedelta(days=1)).time,
+                         first)
+        self.assertEqual(self.db.next_approach(self.neo, first).time, second)
+        self.assertEqual(self.db.next_approach(self.neo, first + datetime.timedelta(seconds=30)).time,
+                         second)
+        self.assertIsNone(self.db.next_approach(self.neo, self.times[-1]))
+
+    def test_previous_approach(self):
+        first, second = self.times[:2]
+        self.assertEqual(self.db.previous_approach(self.neo, second).time, first)
+        self.assertEqual(self.db.previous_approach(self.neo, second + datetime.timedelta(seconds=30)).time,
+                         second)
+        self.assertIsNone(self.db.previous_approach(self.neo, first))
+
+    def test_approaches_between(self):
+        start, end = self.times[1], self.times[-1]
+        expected = [time for time in self.times if start <= time < end]
+        received = [approach.time for approach in self.db.approaches_between(self.neo, start, end)]
+        self.assertEqual(expected, received)
+        self.assertEqual(len(self.db.approaches_between(self.neo)), len(self.times))
+        self.assertEqual(self.db.approaches_between(self.neo, end, start), [])
+
+    def test_inspect_prints_approaches_in_a_window(self):
+        after, before = self.times[1].date(), self.times[-1].date()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            inspect(self.db, pdes=self.neo.designation, after=after, before=before)
+        expected = [time for time in self.times if after <= time.date() < before]
+        self.assertEqual(len(output.getvalue().splitlines()), 1 + len(expected))
+
+
+class TestColumnarTimeline(TestTimeline):
+    columnar = True
+
+
+if __name__ == '__main__':
+    unittest.main()
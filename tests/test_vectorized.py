@@ -0,0 +1,75 @@
+"""Check that the vectorized NumPy query mode answers like the row-by-row scan.
+
+These tests are skipped if NumPy, an optional dependency, is not installed.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_vectorized
+"""
+import datetime
+import subprocess
+import sys
+import unittest
+import unittest.mock
+
+import vectorized
+from filters import create_filters, DistanceFilter
+from tests.support import TESTS_ROOT, BackendTestCase, key
+
+
+CRITERIA = (
+    {},
+    {'date': datetime.date(2020, 3, 2)},
+    {'start_date': datetime.date(2020, 4, 1), 'end_date': datetime.date(2020, 6, 30)},
+    {'distance_min': 0.4, 'velocity_max': 5},
+    {'velocity_min': 1, 'diameter_max': 1},
+    {'diameter_min': 0.5, 'hazardous': True},
+    {'hazardous': False, 'start_date': datetime.date(2020, 12, 1)},
+)
+
+
+@unittest.skipUnless(vectorized.available(), "NumPy is not installed.")
+class TestVectorizedQuery(BackendTestCase):
+    cache_size = 0
+
+    def test_vectorized_matches_row_scan(self):
+        for db in (self.db, self.columnar):
+            for criteria in CRITERIA:
+                filters = create_filters(**criteria)
+                expected = [key(a) for a in db.query(filters)]
+                received = [key(a) for a in db.query(filters, vectorized_scan=True)]
+                self.assertEqual(expected, received, msg=criteria)
+
+    def test_unvectorizable_filters_are_checked_per_row(self):
+        filters = [DistanceFilter(lambda a, b: a * 2 < b, 0.1)]
+        expected = [key(a) for a in self.db.query(filters)]
+        received = [key(a) for a in self.db.query(filters, vectorized_scan=True)]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(expected, received)
+
+    def test_default_store_is_scanned_by_row(self):
+        filters = create_filters(distance_max=0.1)
+        with unittest.mock.patch.object(vectorized, 'scan', side_effect=AssertionError):
+            received = [key(a) for a in self.db.query(filters, vectorized_scan=True)]
+        self.assertEqual(received, [key(a) for a in self.db.query(filters)])
+        with self.assertRaises(TypeError):
+            vectorized.columns(self.db._approaches)
+
+    def test_table_columns_share_memory(self):
+        table = self.columnar._approaches
+        columns = vectorized.columns(table)
+        self.assertEqual(columns['distance'][0], table.distance[0])
+        self.assertFalse(columns['distance'].flags.owndata)
+        self.assertEqual(len(columns['neo']), len(table))
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_numpy_is_not_imported_with_the_cli(self):
+        code = "import sys, main; print('numpy' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], cwd=TESTS_ROOT.parent,
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
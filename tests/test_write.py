@@ -18,16 +18,24 @@ import collections.abc
 import contextlib
 import csv
 import datetime
+import gzip
 import io
 import json
+import lzma
+import math
 import pathlib
+import tempfile
+import threading
+import time
 import unittest
 import unittest.mock
 
 
 from extract import load_neos, load_approaches
+from models import NearEarthObject, CloseApproach
 from database import NEODatabase
-from write import write_to_csv, write_to_json
+from write import (ColumnReader, write_pipelined, write_to_columns, write_to_csv, write_to_json,
+                   write_to_ndjson, writer_for)
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -226,5 +234,272 @@ class TestWriteToJSON(unittest.TestCase):
         self.assertIsInstance(approach['neo']['potentially_hazardous'], bool)
 
 
+class TestWriteToJSONStreaming(unittest.TestCase):
+    @staticmethod
+    def write(results):
+        with unittest.mock.patch('write.open') as mock_file, UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_json(results, None)
+            return buf.getvalue()
+
+    @staticmethod
+    def expected(results):
+        return json.dumps([{
+            'datetime_utc': approach.time_str,
+            'distance_au': approach.distance,
+            'velocity_km_s': approach.velocity,
+            'neo': {
+                'designation': approach.neo.designation,
+                'name': approach.neo.name,
+                'diameter_km': approach.neo.diameter,
+                'potentially_hazardous': approach.neo.hazardous,
+            },
+        } for approach in results], indent=4)
+
+    def test_output_matches_dumping_the_whole_list(self):
+        for n in (0, 1, 5):
+            results = build_results(n)
+            self.assertEqual(self.write(results), self.expected(results), msg=n)
+
+    def test_output_is_written_in_chunks(self):
+        results = build_results(25)
+        with unittest.mock.patch('write.JSON_CHUNK_SIZE', 10):
+            self.assertEqual(self.write(iter(results)), self.expected(results))
+
+
+class TestWriteToCSVMatchesRowByRow(unittest.TestCase):
+    @staticmethod
+    def write(results):
+        with unittest.mock.patch('write.open') as mock_file, UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_csv(results, None)
+            return buf.getvalue()
+
+    @staticmethod
+    def expected(results):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(('datetime_utc', 'distance_au', 'velocity_km_s', 'designation', 'name',
+                         'diameter_km', 'potentially_hazardous'))
+        for approach in results:
+            neo = approach.neo
+            writer.writerow((approach.time, approach.distance, approach.velocity,
+                             neo.designation, neo.name, neo.diameter, neo.hazardous))
+        return buf.getvalue()
+
+    def test_output_matches_writing_row_by_row(self):
+        results = build_results(300)
+        with unittest.mock.patch('write.CSV_CHUNK_SIZE', 7):
+            self.assertEqual(self.write(results), self.expected(results))
+
+    def test_fields_are_quoted_and_times_keep_their_precision(self):
+        neo = NearEarthObject(designation='2020 "X"', name='Comma, Inc.', diameter='1.5',
+                              hazardous='Y')
+        results = []
+        for time in (datetime.datetime(2020, 1, 2, 3, 4), datetime.datetime(2020, 1, 2, 3, 4, 5, 6),
+                     None):
+            approach = CloseApproach(designation=neo.designation, distance=0.1, velocity=2.0)
+            approach.time, approach.neo = time, neo
+            results.append(approach)
+        self.assertEqual(self.write(results), self.expected(results))
+
+
+class TestWriteToNDJSON(unittest.TestCase):
+    @classmethod
+    @unittest.mock.patch('write.open')
+    def setUpClass(cls, mock_file):
+        cls.results = build_results(5)
+        with UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_ndjson(cls.results, None)
+            cls.value = buf.getvalue()
+
+    def test_ndjson_has_one_object_per_line(self):
+        lines = self.value.splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(self.value.endswith('\n'))
+        for line, approach in zip(lines, self.results):
+            row = json.loads(line)
+            self.assertEqual(row['datetime_utc'], approach.time_str)
+            self.assertEqual(row['neo']['designation'], approach.neo.designation)
+
+    def test_ndjson_elements_match_json_elements(self):
+        with unittest.mock.patch('write.open') as mock_file, UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_json(self.results, None)
+            elements = json.loads(buf.getvalue())
+        self.assertEqual([json.loads(line) for line in self.value.splitlines()], elements)
+
+    def test_errors_propagate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(OSError):
+                write_to_ndjson(self.results, pathlib.Path(tmp) / 'missing' / 'results.ndjson')
+
+
+class TestCompressedOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.results = build_results(5)
+
+    def test_writer_is_chosen_by_suffix(self):
+        self.assertIs(writer_for(pathlib.Path('results.csv')), write_to_csv)
+        self.assertIs(writer_for(pathlib.Path('results.json.bz2')), write_to_json)
+        self.assertIs(writer_for(pathlib.Path('results.ndjson.gz')), write_to_ndjson)
+        self.assertIs(writer_for(pathlib.Path('results.jsonl.xz')), write_to_ndjson)
+        self.assertIsNone(writer_for(pathlib.Path('results.txt')))
+        self.assertIsNone(writer_for(pathlib.Path('results.gz')))
+
+    def test_gzip_ndjson_round_trip(self):
+        path = pathlib.Path(self.tmp.name) / 'results.ndjson.gz'
+        write_to_ndjson(self.results, path)
+        with gzip.open(path, 'rt') as infile:
+            self.assertEqual(len(infile.readlines()), 5)
+
+    def test_compressed_output_matches_uncompressed(self):
+        plain = pathlib.Path(self.tmp.name) / 'results.csv'
+        packed = pathlib.Path(self.tmp.name) / 'results.csv.xz'
+        write_to_csv(self.results, plain)
+        write_to_csv(self.results, packed)
+        with lzma.open(packed, 'rt') as infile:
+            self.assertEqual(infile.read(), plain.read_text())
+
+
+class TestColumnarOutput(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.results = build_results(50)
+        cls.path = pathlib.Path(cls.tmp.name) / 'results.neocol'
+        write_to_columns(cls.results, cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_writer_is_chosen_by_suffix(self):
+        self.assertIs(writer_for(self.path), write_to_columns)
+        self.assertIsNone(writer_for(pathlib.Path('results.neocol.gz')))
+
+    def test_columns_round_trip(self):
+        with ColumnReader(self.path) as reader:
+            self.assertEqual(len(reader), len(self.results))
+            for row, approach in enumerate(self.results):
+                neo = approach.neo
+                self.assertEqual(reader.time_at(row), approach.time)
+                self.assertEqual(reader.distance[row], approach.distance)
+                self.assertEqual(reader.velocity[row], approach.velocity)
+                self.assertEqual(reader.string(reader.designation[row]), neo.designation)
+                self.assertEqual(reader.string(reader.name[row]), neo.name)
+                self.assertEqual(bool(reader.hazardous[row]), neo.hazardous)
+                if math.isnan(neo.diameter):
+                    self.assertTrue(math.isnan(reader.diameter[row]))
+                else:
+                    self.assertEqual(reader.diameter[row], neo.diameter)
+
+    def test_columns_are_views_of_the_file(self):
+        with ColumnReader(self.path) as reader:
+            self.assertIsInstance(reader.distance, memoryview)
+            self.assertEqual(reader.distance.format, 'd')
+            self.assertEqual(list(reader.distance), [a.distance for a in self.results])
+
+    def test_empty_results(self):
+        path = pathlib.Path(self.tmp.name) / 'empty.neocol'
+        write_to_columns([], path)
+        with ColumnReader(path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(len(reader.time), 0)
+
+    def test_other_files_are_rejected(self):
+        path = pathlib.Path(self.tmp.name) / 'results.csv'
+        write_to_csv(self.results, path)
+        with self.assertRaises(ValueError):
+            ColumnReader(path)
+
+    def test_empty_files_are_rejected(self):
+        path = pathlib.Path(self.tmp.name) / 'empty.neocol'
+        path.touch()
+        with self.assertRaises(ValueError):
+            ColumnReader(path)
+
+    def test_truncated_files_are_rejected(self):
+        path = pathlib.Path(self.tmp.name) / 'results.neocol'
+        write_to_columns(self.results, path)
+        data = path.read_bytes()
+        for length in (40, len(data) // 2, len(data) - 1):
+            with self.subTest(length=length):
+                path.write_bytes(data[:length])
+                with self.assertRaisesRegex(ValueError, "truncated"):
+                    ColumnReader(path)
+
+
+class TestPipelinedWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.results = build_results(100)
+
+    def test_output_matches_writing_directly(self):
+        direct = pathlib.Path(self.tmp.name) / 'direct.ndjson.gz'
+        piped = pathlib.Path(self.tmp.name) / 'piped.ndjson.gz'
+        write_to_ndjson(self.results, direct)
+        write_pipelined(write_to_ndjson, iter(self.results), piped, batch_size=3, queue_size=1)
+        with gzip.open(direct, 'rt') as expected, gzip.open(piped, 'rt') as received:
+            self.assertEqual(expected.read(), received.read())
+
+    def test_writer_runs_in_another_thread(self):
+        threads = []
+
+        def writer(results, filename):
+            threads.append(threading.current_thread())
+            self.assertEqual(len(list(results)), len(self.results))
+
+        write_pipelined(writer, self.results, None)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_writer_errors_stop_the_producer(self):
+        missing = pathlib.Path(self.tmp.name) / 'missing'
+        for writer, name in ((write_to_json, 'results.json'), (write_to_ndjson, 'results.ndjson'),
+                             (write_to_csv, 'results.csv')):
+            with self.subTest(writer=writer.__name__):
+                drawn = []
+
+                def results():
+                    for approach in self.results:
+                        drawn.append(approach)
+                        time.sleep(0.001)  # Give the writer thread time to fail.
+                        yield approach
+
+                with self.assertRaises(OSError):
+                    write_pipelined(writer, results(), missing / name)
+                # All of them would fit in one batch; the failure stops the batch.
+                self.assertLess(len(drawn), len(self.results))
+
+    def test_first_result_is_drawn_before_the_writer_starts(self):
+        filename = pathlib.Path(self.tmp.name) / 'results.csv'
+        threads = []
+
+        def results():
+            threads.extend(t.name for t in threading.enumerate())
+            yield from self.results
+
+        write_pipelined(write_to_csv, results(), filename)
+        self.assertNotIn(f'write {filename}', threads)
+
+    def test_producer_errors_end_the_writer_and_propagate(self):
+        written = []
+
+        def results():
+            yield from self.results[:10]
+            raise ValueError("bad row")
+
+        def writer(results, filename):
+            written.extend(results)
+
+        with self.assertRaisesRegex(ValueError, "bad row"):
+            write_pipelined(writer, results(), None, batch_size=4)
+        self.assertEqual(written, list(self.results[:8]))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,103 @@
+"""Evaluate filters as NumPy boolean masks over whole columns of approaches.
+
+Instead of testing one row at a time, each filter is applied to an entire
+column in a single vectorized comparison, and the resulting boolean masks are
+combined with `&`. Filters on NEO attributes (diameter, hazardous) are first
+evaluated once per NEO and then broadcast to the approaches through the
+approach-to-NEO index column. Only the positions of the surviving rows are
+returned, so `CloseApproach` objects are built just for the matches.
+
+Only an `ApproachTable` is scanned this way: its columns are wrapped without
+copying. The default `ApproachList` would first have to copy every value into
+new columns, which costs more than the scan saves, so `NEODatabase` scans it
+row by row instead.
+
+NumPy is an optional dependency: everything else in this project works without
+it, and `scan` raises `ImportError` if it is not installed. It is only imported
+once a vectorized scan runs, since importing it costs more than most commands.
+"""
+
+import importlib.util
+import operator
+
+from storage import _MINUTES_PER_DAY, ApproachTable
+
+# Comparators that apply elementwise to a NumPy array.
+_VECTOR_OPERATORS = (operator.eq, operator.ne, operator.lt, operator.le, operator.gt, operator.ge)
+
+# Fields read per approach and per NEO.
+_APPROACH_FIELDS = ('time', 'date', 'distance', 'velocity')
+_NEO_FIELDS = ('diameter', 'hazardous')
+
+
+def available():
+    """Return whether NumPy is installed, and so whether `scan` can be used."""
+    return importlib.util.find_spec('numpy') is not None
+
+
+def _numpy():
+    """Import and return NumPy, which only this query mode needs."""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("The vectorized query mode requires NumPy (pip install numpy).") from None
+    return numpy
+
+
+def _table_columns(table):
+    """Wrap the columns of an `ApproachTable` as NumPy arrays, without copying."""
+    np = _numpy()
+    time = np.frombuffer(table.time, dtype=np.int64)
+    return {
+        'time': time,
+        'date': time // _MINUTES_PER_DAY,
+        'distance': np.frombuffer(table.distance, dtype=np.float64),
+        'velocity': np.frombuffer(table.velocity, dtype=np.float64),
+        'neo': np.frombuffer(table.neo, dtype=np.int32),
+        'diameter': np.frombuffer(table.neo_diameter, dtype=np.float64),
+        'hazardous': np.frombuffer(table.neo_hazardous, dtype=np.int8).astype(bool),
+    }
+
+
+def columns(store):
+    """Return a dict of NumPy arrays holding every field of an `ApproachTable`."""
+    if not store.columnar:
+        raise TypeError("Only an ApproachTable can be scanned with NumPy.")
+    return _table_columns(store)
+
+
+def scan(store, filters, rows=None):
+    """Return the row positions, in order, that pass every filter.
+
+    :param store: An `ApproachTable`.
+    :param filters: A collection of `AttributeFilter`s.
+    :param rows: Row positions to consider, or None for every row.
+    :return: A list of row positions.
+    """
+    np = _numpy()
+    cols = columns(store)
+    rows = None if rows is None else np.asarray(rows, dtype=np.int64)
+    neo = cols['neo'] if rows is None else cols['neo'][rows]
+    mask = np.ones(len(neo), dtype=bool)
+
+    residual = []
+    for f in filters:
+        field = getattr(f, 'field', None)
+        if f.op not in _VECTOR_OPERATORS or field not in _APPROACH_FIELDS + _NEO_FIELDS:
+            residual.append(f)
+            continue
+        value = ApproachTable.encode(field, f.value)
+        if field in _NEO_FIELDS:
+            # Decide once per NEO, then broadcast to its approaches.
+            mask &= f.op(cols[field], value)[neo]
+        else:
+            column = cols[field] if rows is None else cols[field][rows]
+            mask &= f.op(column, value)
+
+    matches = np.flatnonzero(mask)
+    if rows is not None:
+        matches = rows[matches]
+    matches = matches.tolist()
+    if residual:
+        matches = list(store.scan(residual, matches))
+    return matches